@@ -1,27 +1,92 @@
-"""Shared utilities for PolicyGuard MCP server."""
+"""Shared utilities for PolicyGuard MCP server.
 
+The data directory is read from POLICYGUARD_DATA_DIR once, at import;
+changing the variable afterwards has no effect. To point an imported
+module at another directory (e.g. in tests), call set_data_dir(). Tool
+modules import this module as ``core.utils`` (with src/ on sys.path), so
+that is the module whose directory has to be set.
+"""
+
+import atexit
 import json
+import logging
+import mmap
 import os
-import uuid
+import queue
+import stat
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field, fields, is_dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Optional
 
 import yaml
 
+# orjson is an optional speedup; fall back to the stdlib json module
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+
+def _json_loads(data: str | bytes) -> Any:
+    """Parse JSON with orjson if installed, else with the stdlib."""
+    if orjson is None:
+        return json.loads(data)
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError as e:
+        # orjson rejects escaped lone surrogates, which dumps_bytes
+        # writes via the stdlib fallback
+        try:
+            return json.loads(data)
+        except ValueError:
+            raise e from None
+
+
+# Prefer the libyaml C bindings when PyYAML was built with them
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader  # type: ignore[assignment]
+
+# Parsed YAML configs keyed by path, stored with the file's mtime_ns so
+# edits on disk are picked up without re-parsing on every call
+_CONFIG_CACHE: dict[str, tuple[int, dict[str, Any]]] = {}
+
 
 def load_config(config_path: str) -> dict[str, Any]:
     """Load configuration from YAML file.
 
+    The parsed result is cached until the file's mtime changes. The returned
+    dictionary is shared between callers and must not be mutated.
+
     Args:
         config_path: Path to the configuration file
 
     Returns:
         Configuration dictionary
     """
+    try:
+        mtime_ns = os.stat(config_path).st_mtime_ns
+    except FileNotFoundError:
+        _CONFIG_CACHE.pop(config_path, None)
+        return {}
+    except OSError as e:
+        print(f"Error loading config from {config_path}: {e}")
+        return {}
+
+    cached = _CONFIG_CACHE.get(config_path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+
     try:
         with open(config_path) as f:
-            return yaml.safe_load(f) or {}
+            config = yaml.load(f, Loader=_YamlLoader) or {}
+        _CONFIG_CACHE[config_path] = (mtime_ns, config)
+        return config
     except FileNotFoundError:
         return {}
     except Exception as e:
@@ -33,7 +98,7 @@ def get_shared_config() -> dict[str, Any]:
     """Get shared configuration that tools can access.
 
     Returns:
-        Shared configuration dictionary
+        Shared configuration dictionary (cached, do not mutate)
     """
     config = load_config("manifest.yaml")
     tools_config = config.get("tools", {})
@@ -49,7 +114,7 @@ def get_tool_config(tool_name: str) -> dict[str, Any]:
         tool_name: Name of the tool
 
     Returns:
-        Tool-specific configuration
+        Tool-specific configuration (cached, do not mutate)
     """
     shared_config = get_shared_config()
     tool_config = shared_config.get(tool_name, {})
@@ -71,16 +136,159 @@ def get_env_var(key: str, default: str = "") -> str:
     return os.environ.get(key, default)
 
 
+# Random bytes for generate_id, fetched from the OS in bulk
+_ID_BYTES = 6
+_ID_POOL_SIZE = 4096
+_id_pool = b""
+_id_pool_pos = 0
+_id_lock = threading.Lock()
+
+
+def _reset_id_pool() -> None:
+    """Drop buffered randomness so a forked child never reuses the parent's."""
+    global _id_pool, _id_pool_pos
+    _id_pool, _id_pool_pos = b"", 0
+
+
+# fork() and this hook only exist on POSIX
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_id_pool)
+
+
 def generate_id(prefix: str = "grd") -> str:
     """Generate a unique ID with a prefix.
 
+    The random part is sliced from a pool filled by one os.urandom() call
+    per ~680 IDs rather than one call per ID.
+
     Args:
         prefix: ID prefix (e.g., 'aud' for audit, 'pol' for policy)
 
     Returns:
         Unique ID string
     """
-    return f"{prefix}_{uuid.uuid4().hex[:12]}"
+    global _id_pool, _id_pool_pos
+    with _id_lock:
+        if _id_pool_pos + _ID_BYTES > len(_id_pool):
+            _id_pool, _id_pool_pos = os.urandom(_ID_POOL_SIZE), 0
+        start = _id_pool_pos
+        _id_pool_pos = start + _ID_BYTES
+        chunk = _id_pool[start:_id_pool_pos]
+    return f"{prefix}_{chunk.hex()}"
+
+
+def new_action_id() -> str:
+    """Generate the ID correlating a validation with its audit entry.
+
+    Returns:
+        Unique ID string prefixed with 'act'
+    """
+    return generate_id("act")
+
+
+def loads_json(data: str | bytes) -> Any:
+    """Parse a JSON document, using orjson when installed.
+
+    Args:
+        data: JSON text
+
+    Returns:
+        Parsed value
+
+    Raises:
+        json.JSONDecodeError: If the text is not valid JSON
+    """
+    return _json_loads(data)
+
+
+def safe_loads_json(data: str | bytes, default: Any) -> Any:
+    """Parse a JSON document, falling back to a default.
+
+    Args:
+        data: JSON text (may be empty)
+        default: Value returned when data is empty or not valid JSON
+
+    Returns:
+        Parsed value, or default
+    """
+    if not data:
+        return default
+    try:
+        return _json_loads(data)
+    except json.JSONDecodeError:
+        return default
+
+
+# Tool responses are consumed by MCP clients, so they are compact unless
+# POLICYGUARD_PRETTY_JSON is set for debugging
+_PRETTY_RESPONSES = os.environ.get("POLICYGUARD_PRETTY_JSON", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+def dumps_response(obj: Any) -> str:
+    """Serialize a tool response to a JSON string.
+
+    Output is compact unless the POLICYGUARD_PRETTY_JSON environment
+    variable is set, in which case it is indented. Tools must return str:
+    FastMCP would serialize bytes as a JSON string rather than passing
+    them through as text content.
+
+    Args:
+        obj: Response object
+
+    Returns:
+        JSON string
+    """
+    if orjson is not None:
+        return dumps_bytes(obj, pretty=_PRETTY_RESPONSES).decode()
+    # json.dumps already produces str; skip the encode/decode round trip
+    if _PRETTY_RESPONSES:
+        return json.dumps(obj, indent=2, default=_json_default)
+    return json.dumps(obj, separators=(",", ":"), default=_json_default)
+
+
+def dumps_bytes(obj: Any, pretty: bool = False) -> bytes:
+    """Serialize an object to UTF-8 encoded JSON.
+
+    Uses orjson when installed; unknown types are converted with str().
+    Objects orjson rejects (e.g. strings with lone surrogates) fall back
+    to the stdlib json module, which escapes them.
+
+    Args:
+        obj: Object to serialize
+        pretty: Indent the output for human readers; otherwise emit
+            compact JSON without whitespace
+
+    Returns:
+        JSON bytes
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=str, option=option)
+        except orjson.JSONEncodeError:
+            pass
+    if pretty:
+        return json.dumps(obj, indent=2, default=_json_default).encode()
+    return json.dumps(obj, separators=(",", ":"), default=_json_default).encode()
+
+
+def _json_default(obj: Any) -> Any:
+    """Convert objects the stdlib encoder does not know (orjson handles
+    dataclasses natively)."""
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return _dataclass_dict(obj)
+    return str(obj)
+
+
+def _dataclass_dict(obj: Any) -> dict[str, Any]:
+    """Shallow dict of a dataclass instance's fields (unlike asdict(), no deep copy)."""
+    return {f.name: getattr(obj, f.name) for f in fields(obj)}
 
 
 def get_timestamp() -> str:
@@ -92,6 +300,100 @@ def get_timestamp() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def entry_epoch(entry: dict[str, Any]) -> Optional[float]:
+    """Get an entry's ISO timestamp as POSIX seconds.
+
+    Entries written by append_jsonl carry a precomputed ``_ts_epoch``
+    field; for older entries it is parsed once and stored on the entry.
+
+    Args:
+        entry: Record with a "timestamp" field
+
+    Returns:
+        Seconds since the epoch, or None if the timestamp is invalid
+    """
+    epoch = entry.get("_ts_epoch")
+    if epoch is None:
+        epoch = _parse_epoch(entry.get("timestamp", ""))
+        if epoch is not None:
+            entry["_ts_epoch"] = epoch
+    return epoch
+
+
+def public_entry(entry: dict[str, Any]) -> dict[str, Any]:
+    """Get a log entry without internal fields, for use in responses.
+
+    Args:
+        entry: Record loaded from a JSON Lines log
+
+    Returns:
+        The entry itself, or a copy without ``_ts_epoch`` if it had one
+    """
+    if "_ts_epoch" not in entry:
+        return entry
+    return {k: v for k, v in entry.items() if k != "_ts_epoch"}
+
+
+def index_since(entries: list[dict[str, Any]], cutoff_epoch: float) -> int:
+    """Find the first entry at or after a cutoff in a chronological list.
+
+    Logs written with append_jsonl are in timestamp order, so the cutoff
+    can be located by binary search instead of scanning every entry.
+    Entries with a missing or invalid timestamp have no place in that
+    order; the search steps over them to the next dated entry, so where
+    they sit does not affect the result.
+
+    Args:
+        entries: Entries in append (oldest first) order
+        cutoff_epoch: Cutoff in seconds since the epoch
+
+    Returns:
+        Index after the last dated entry older than the cutoff
+    """
+    lo, hi = 0, len(entries)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        probe = mid
+        epoch = entry_epoch(entries[probe])
+        while epoch is None and probe + 1 < hi:
+            probe += 1
+            epoch = entry_epoch(entries[probe])
+        if epoch is not None and epoch < cutoff_epoch:
+            lo = probe + 1
+        else:
+            hi = mid
+    return lo
+
+
+def entries_since(
+    entries: list[dict[str, Any]], cutoff_epoch: float
+) -> list[dict[str, Any]]:
+    """Get the entries of a chronological log at or after a cutoff.
+
+    Entries with a missing or invalid timestamp cannot be placed in time,
+    so they are never included.
+
+    Args:
+        entries: Entries in append (oldest first) order
+        cutoff_epoch: Cutoff in seconds since the epoch
+
+    Returns:
+        Matching entries, oldest first
+    """
+    return [
+        e for e in entries[index_since(entries, cutoff_epoch):]
+        if entry_epoch(e) is not None
+    ]
+
+
+def _parse_epoch(timestamp: Any) -> Optional[float]:
+    """Parse an ISO timestamp string into POSIX seconds, or None."""
+    try:
+        return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp()
+    except (ValueError, AttributeError):
+        return None
+
+
 # ============================================================================
 # JSON File Storage (Simple persistence for hackathon demo)
 # ============================================================================
@@ -101,15 +403,42 @@ _data_dir_str = os.environ.get("POLICYGUARD_DATA_DIR", "data")
 DATA_DIR = Path(_data_dir_str)
 
 
+# Data directories already created by ensure_data_dir()
+_data_dir_ensured: set[Path] = set()
+
+
 def set_data_dir(path: str) -> None:
     """Set the data directory path (used for testing)."""
     global DATA_DIR
+    # Deferred agent changes belong to the old directory
+    flush_agents()
     DATA_DIR = Path(path)
+    _data_dir_ensured.clear()
+
+
+def reset_caches() -> None:
+    """Forget all in-memory state derived from data and config files.
+
+    Nothing is read here; caches refill lazily on next use. Pending
+    deferred agent changes are written first so they are not lost.
+    """
+    flush_agents()
+    _CONFIG_CACHE.clear()
+    _policies_cache.update(
+        path=None, mtime_ns=None, list=None, id_index={}, views={}
+    )
+    _agents_cache.update(path=None, mtime_ns=None, agents=None, dirty=False)
+    _jsonl_appends.clear()
+    _legacy_checked.clear()
+    _data_dir_ensured.clear()
 
 
 def ensure_data_dir() -> None:
-    """Ensure the data directory exists."""
+    """Ensure the data directory exists (checked once per directory)."""
+    if DATA_DIR in _data_dir_ensured:
+        return
     DATA_DIR.mkdir(exist_ok=True)
+    _data_dir_ensured.add(DATA_DIR)
 
 
 def load_json_file(filename: str, default: Any = None) -> Any:
@@ -129,19 +458,20 @@ def load_json_file(filename: str, default: Any = None) -> Any:
         return default if default is not None else {}
     
     try:
-        with open(filepath) as f:
-            return json.load(f)
+        with open(filepath, "rb") as f:
+            return _json_loads(f.read())
     except Exception as e:
         print(f"Error loading {filename}: {e}")
         return default if default is not None else {}
 
 
-def save_json_file(filename: str, data: Any) -> bool:
+def save_json_file(filename: str, data: Any, pretty: bool = False) -> bool:
     """Save data to a JSON file.
 
     Args:
         filename: Name of the file in the data directory
         data: Data to save
+        pretty: Indent the file for human readers (default: compact)
 
     Returns:
         True if successful, False otherwise
@@ -150,33 +480,633 @@ def save_json_file(filename: str, data: Any) -> bool:
     filepath = DATA_DIR / filename
     
     try:
-        with open(filepath, "w") as f:
-            json.dump(data, f, indent=2, default=str)
+        # Serialize up front so the file gets a single write() call
+        _atomic_write(filepath, dumps_bytes(data, pretty=pretty))
         return True
     except Exception as e:
         print(f"Error saving {filename}: {e}")
         return False
 
 
-def append_to_json_list(filename: str, item: Any, max_items: int = 1000) -> bool:
-    """Append an item to a JSON list file, maintaining max size.
+# The process umask, for the mode of files created by _atomic_write. It
+# can only be read by setting it, so this is done once, at import.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _atomic_write(filepath: Path, data: bytes) -> None:
+    """Replace a file's contents atomically.
+
+    Data is written to a temporary file in the same directory which is
+    then renamed over the target, so readers see either the old or the
+    new contents and never a truncated file.
+    """
+    with tempfile.NamedTemporaryFile(
+        dir=filepath.parent, prefix=f".{filepath.name}.", suffix=".tmp", delete=False
+    ) as f:
+        tmp_path = f.name
+        try:
+            f.write(data)
+            # Temp files are created 0600; keep the target's permissions,
+            # or use what open() would give a new file
+            try:
+                mode = stat.S_IMODE(os.stat(filepath).st_mode)
+            except FileNotFoundError:
+                mode = 0o666 & ~_UMASK
+            os.chmod(tmp_path, mode)
+        except BaseException:
+            f.close()
+            os.unlink(tmp_path)
+            raise
+    try:
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# ============================================================================
+# Policy Storage
+# ============================================================================
+
+# Parsed policies.json, reused until the file's mtime changes, plus a
+# policy id -> list index map for O(1) lookups and any structures that
+# callers derived from the list (see get_policy_view)
+_policies_cache: dict[str, Any] = {
+    "path": None,
+    "mtime_ns": None,
+    "list": None,
+    "id_index": {},
+    "views": {},
+}
+
+
+def _file_mtime_ns(filepath: Path) -> Optional[int]:
+    """Get a file's mtime in nanoseconds, or None if it does not exist."""
+    try:
+        return os.stat(filepath).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _cache_policies(filepath: Path, policies: list[dict[str, Any]]) -> None:
+    """Store policies in the cache and rebuild the id index."""
+    id_index: dict[str, int] = {}
+    for i, policy in enumerate(policies):
+        id_index.setdefault(policy.get("id"), i)
+    _policies_cache.update(
+        path=filepath,
+        mtime_ns=_file_mtime_ns(filepath),
+        list=policies,
+        id_index=id_index,
+        views={},
+    )
+
+
+def load_policies() -> tuple[list[dict[str, Any]], dict[str, int]]:
+    """Load policies, reusing the parsed list while policies.json is unchanged.
+
+    The list is kept sorted by priority (higher first). Both returned
+    objects are shared with the cache: callers that modify the list must
+    persist it with save_policies().
+
+    Returns:
+        Tuple of (policies, mapping of policy id to list index)
+    """
+    filepath = DATA_DIR / "policies.json"
+    cache = _policies_cache
+    if (
+        cache["list"] is not None
+        and cache["path"] == filepath
+        and cache["mtime_ns"] == _file_mtime_ns(filepath)
+    ):
+        return cache["list"], cache["id_index"]
+
+    policies = load_json_file("policies.json", default=[])
+    if not isinstance(policies, list):
+        policies = []
+    policies.sort(key=lambda p: p.get("priority", 0), reverse=True)
+    _cache_policies(filepath, policies)
+    return policies, cache["id_index"]
+
+
+def get_policy_view(name: str, build: Callable[[list[dict[str, Any]]], Any]) -> Any:
+    """Get a structure derived from the policies, cached alongside them.
+
+    ``build`` is called with the policy list the first time a view is
+    requested and again after the policies are reloaded or saved.
+
+    Args:
+        name: Key identifying the view
+        build: Function computing the view from the policy list
+
+    Returns:
+        The cached view
+    """
+    policies, _ = load_policies()
+    views = _policies_cache["views"]
+    if name not in views:
+        views[name] = build(policies)
+    return views[name]
+
+
+def save_policies(policies: list[dict[str, Any]]) -> bool:
+    """Save policies to policies.json and refresh the cache.
+
+    Args:
+        policies: Policies sorted by priority (higher first)
+
+    Returns:
+        True if successful, False otherwise
+    """
+    if not save_json_file("policies.json", policies):
+        # The cached list may have been modified in place; drop it
+        _policies_cache["list"] = None
+        return False
+    _cache_policies(DATA_DIR / "policies.json", policies)
+    return True
+
+
+# ============================================================================
+# Agent Storage
+# ============================================================================
+
+# Parsed agents.json, reused until the file's mtime changes. "dirty" marks
+# changes from save_agents_deferred() that are not on disk yet.
+_agents_cache: dict[str, Any] = {
+    "path": None,
+    "mtime_ns": None,
+    "agents": None,
+    "dirty": False,
+}
+_agents_lock = threading.Lock()
+
+# Seconds to collect deferred agent changes before writing them
+_AGENTS_FLUSH_DELAY = 0.5
+_agents_dirty = threading.Event()
+_agents_flusher: Optional[threading.Thread] = None
+
+
+def load_agents() -> dict[str, Any]:
+    """Load registered agents, reusing the parsed dict while agents.json is unchanged.
+
+    The returned dict is shared with the cache: callers that modify it
+    must persist it with save_agents().
+
+    Returns:
+        Mapping of agent ID to agent record
+    """
+    filepath = DATA_DIR / "agents.json"
+    cache = _agents_cache
+    if cache["dirty"] and cache["path"] == filepath:
+        # Unsaved changes are newer than whatever is on disk
+        return cache["agents"]
+    mtime_ns = _file_mtime_ns(filepath)
+    if (
+        cache["agents"] is not None
+        and cache["path"] == filepath
+        and cache["mtime_ns"] == mtime_ns
+    ):
+        return cache["agents"]
+
+    agents = load_json_file("agents.json", default={})
+    if not isinstance(agents, dict):
+        agents = {}
+    cache.update(path=filepath, mtime_ns=mtime_ns, agents=agents)
+    return agents
+
+
+def save_agents(agents: dict[str, Any]) -> bool:
+    """Save agents to agents.json and refresh the cache.
+
+    Args:
+        agents: Mapping of agent ID to agent record
+
+    Returns:
+        True if successful, False otherwise
+    """
+    with _agents_lock:
+        if not save_json_file("agents.json", agents):
+            # The cached dict may have been modified in place; drop it
+            _agents_cache.update(agents=None, dirty=False)
+            return False
+        filepath = DATA_DIR / "agents.json"
+        _agents_cache.update(
+            path=filepath,
+            mtime_ns=_file_mtime_ns(filepath),
+            agents=agents,
+            dirty=False,
+        )
+        return True
+
+
+def save_agents_deferred(agents: dict[str, Any]) -> None:
+    """Cache agents now and write agents.json shortly afterwards.
+
+    For changes that can wait, such as auto-registering an unknown agent:
+    a background thread writes once per ``_AGENTS_FLUSH_DELAY`` seconds
+    however many changes arrived, so callers do not pay for rewriting the
+    whole file. Pending changes are also written at exit and by
+    flush_agents().
+
+    Args:
+        agents: Mapping of agent ID to agent record
+    """
+    global _agents_flusher
+    with _agents_lock:
+        _agents_cache.update(
+            path=DATA_DIR / "agents.json", agents=agents, dirty=True
+        )
+        if _agents_flusher is None:
+            _agents_flusher = threading.Thread(
+                target=_run_agents_flusher,
+                name="policyguard-agents-flusher",
+                daemon=True,
+            )
+            _agents_flusher.start()
+    _agents_dirty.set()
+
+
+def flush_agents() -> bool:
+    """Write any changes queued by save_agents_deferred() to disk.
+
+    Returns:
+        True if nothing was pending or the write succeeded, False otherwise
+    """
+    with _agents_lock:
+        if not _agents_cache["dirty"]:
+            return True
+        filepath = _agents_cache["path"]
+        try:
+            filepath.parent.mkdir(exist_ok=True)
+            _atomic_write(filepath, dumps_bytes(_agents_cache["agents"]))
+        except Exception as e:
+            logging.error(f"Error saving {filepath.name}: {e}")
+            _agents_cache.update(agents=None, dirty=False)
+            return False
+        _agents_cache.update(mtime_ns=_file_mtime_ns(filepath), dirty=False)
+        return True
+
+
+def _run_agents_flusher() -> None:
+    """Write deferred agent changes, coalescing bursts, forever."""
+    while True:
+        _agents_dirty.wait()
+        time.sleep(_AGENTS_FLUSH_DELAY)
+        _agents_dirty.clear()
+        flush_agents()
+
+
+atexit.register(flush_agents)
+
+
+def _reset_agents_flusher() -> None:
+    """Forget the parent's flusher thread and locks in a forked child.
+
+    Only the forking thread survives fork(), so the child starts its own
+    flusher on its next deferred save.
+    """
+    global _agents_flusher, _agents_lock, _agents_dirty
+    _agents_flusher = None
+    _agents_lock = threading.Lock()
+    _agents_dirty = threading.Event()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_agents_flusher)
+
+
+# ============================================================================
+# Log Entries
+# ============================================================================
+
+@dataclass(frozen=True, slots=True)
+class AuditEntry:
+    """A record in audit_log.jsonl."""
+
+    entry_id: str
+    timestamp: str
+    agent_id: str
+    action: dict[str, Any]
+    evaluation: dict[str, Any]
+    action_id: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class IncidentEntry:
+    """A record in incidents.jsonl."""
+
+    incident_id: str
+    timestamp: str
+    type: str
+    severity: str
+    agent_id: Optional[str]
+    description: str
+    evidence: dict[str, Any] = field(default_factory=dict)
+    recommended_action: str = ""
+    action_id: Optional[str] = None
+    status: str = "open"
+    resolution: Optional[str] = None
+
+
+# ============================================================================
+# JSON Lines Storage (append-only logs)
+# ============================================================================
+
+# Appends since the last trim, per JSONL file
+_jsonl_appends: dict[Path, int] = {}
+
+
+def append_jsonl(filename: str, item: Any, max_items: int = 1000) -> bool:
+    """Append an item to a JSON Lines file.
+
+    Each append writes a single line, so the cost does not grow with the
+    size of the log. Every ``max_items`` appends the file is trimmed back
+    to its last ``max_items`` lines; lines already in the file when this
+    process first appends to it count as appends. Dataclass items (e.g. AuditEntry) are
+    written as objects of their fields. Items with a "timestamp" get a
+    ``_ts_epoch`` field so readers can filter by time without parsing.
 
     Args:
         filename: Name of the file in the data directory
         item: Item to append
-        max_items: Maximum number of items to keep
+        max_items: Approximate number of items to keep
 
     Returns:
         True if successful, False otherwise
     """
-    data = load_json_file(filename, default=[])
-    if not isinstance(data, list):
-        data = []
-    
-    data.append(item)
-    
-    # Keep only the last max_items
-    if len(data) > max_items:
-        data = data[-max_items:]
-    
-    return save_json_file(filename, data)
+    ensure_data_dir()
+    try:
+        _append_lines(DATA_DIR / filename, [_encode_jsonl(item)], max_items)
+        return True
+    except Exception as e:
+        logging.error(f"Error appending to {filename}: {e}")
+        return False
+
+
+def _encode_jsonl(item: Any) -> bytes:
+    """Serialize an item as one JSON Lines record, adding ``_ts_epoch``.
+
+    Dataclasses are serialized directly (natively by orjson) and the epoch
+    is spliced into the encoded object, rather than building a dict of
+    their fields first.
+    """
+    if isinstance(item, dict):
+        if "_ts_epoch" not in item:
+            epoch = _parse_epoch(item.get("timestamp"))
+            if epoch is not None:
+                item = {**item, "_ts_epoch": epoch}
+        return dumps_bytes(item) + b"\n"
+
+    data = dumps_bytes(item)
+    epoch = _parse_epoch(getattr(item, "timestamp", None))
+    if epoch is not None and data.endswith(b"}") and data != b"{}":
+        data = b'%s,"_ts_epoch":%r}' % (data[:-1], epoch)
+    return data + b"\n"
+
+
+def _append_lines(filepath: Path, lines: list[bytes], max_items: int) -> None:
+    """Append encoded lines to a JSONL file with one write, trimming as needed."""
+    appends = _jsonl_appends.get(filepath)
+    if appends is None:
+        # Lines left by earlier processes count too, so the log stays
+        # capped even if no single process appends max_items times
+        appends = _count_lines(filepath)
+
+    with open(filepath, "ab", buffering=1 << 16) as f:
+        f.write(b"".join(lines))
+
+    appends += len(lines)
+    if appends >= max_items:
+        _trim_jsonl(filepath, max_items)
+        appends = 0
+    _jsonl_appends[filepath] = appends
+
+
+def _count_lines(filepath: Path) -> int:
+    """Count the lines in a file, or 0 if it does not exist."""
+    try:
+        with open(filepath, "rb") as f:
+            return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+    except FileNotFoundError:
+        return 0
+
+
+def _trim_jsonl(filepath: Path, max_items: int) -> None:
+    """Keep only the last max_items lines of a JSON Lines file."""
+    try:
+        with open(filepath, "rb") as f:
+            lines = f.readlines()
+        if len(lines) > max_items:
+            _atomic_write(filepath, b"".join(lines[-max_items:]))
+    except Exception as e:
+        logging.error(f"Error trimming {filepath.name}: {e}")
+
+
+class AuditWriter:
+    """Appends JSON Lines records on a background thread.
+
+    put() serializes the item and queues it; a daemon thread collects
+    whatever arrives within ``flush_interval`` seconds (up to
+    ``max_batch_bytes``) and writes it with one write() per file, keeping
+    file I/O off the request path. Call flush() before reading a log to
+    see everything queued so far.
+    """
+
+    def __init__(
+        self,
+        max_batch_bytes: int = 64 * 1024,
+        flush_interval: float = 0.01,
+        max_queue: int = 10000,
+    ):
+        """Initialize the writer; the thread starts on the first put().
+
+        Args:
+            max_batch_bytes: Write a batch once it reaches this size
+            flush_interval: Maximum seconds to wait for more items
+            max_queue: Queued items before put() blocks
+        """
+        self.max_batch_bytes = max_batch_bytes
+        self.flush_interval = flush_interval
+        # Each queued item is a group of (path, line, max_items) records
+        # submitted together by put() or put_many()
+        self._queue: queue.Queue[list[tuple[Path, bytes, int]]] = queue.Queue(
+            max_queue
+        )
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def put(self, filename: str, item: Any, max_items: int = 1000) -> None:
+        """Queue an item to be appended to a JSONL file in the data directory.
+
+        Args:
+            filename: Name of the file in the data directory
+            item: Item to append
+            max_items: Approximate number of items to keep
+        """
+        self.put_many([(filename, item)], max_items)
+
+    def put_many(self, items: list[tuple[str, Any]], max_items: int = 1000) -> None:
+        """Queue several items at once, e.g. related entries for different logs.
+
+        The items take a single queue slot, so they are written in the same
+        batch.
+
+        Args:
+            items: (filename, item) pairs to append
+            max_items: Approximate number of items to keep per file
+        """
+        self._ensure_started()
+        ensure_data_dir()
+        self._queue.put([
+            (DATA_DIR / filename, _encode_jsonl(item), max_items)
+            for filename, item in items
+        ])
+
+    def flush(self) -> None:
+        """Block until every queued item has been written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _ensure_started(self) -> None:
+        """Start the background thread if it is not running yet."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                thread = threading.Thread(
+                    target=self._run, name="policyguard-audit-writer", daemon=True
+                )
+                thread.start()
+                self._thread = thread
+
+    def _reset_after_fork(self) -> None:
+        """Forget the parent's thread and queue in a forked child.
+
+        The writer thread does not survive fork(), so without this flush()
+        would wait forever for it. Items still queued in the parent are
+        written by the parent.
+        """
+        self._queue = queue.Queue(self._queue.maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _run(self) -> None:
+        """Drain the queue in batches forever."""
+        while True:
+            groups = 1
+            batch = self._queue.get()
+            size = sum(len(line) for _, line, _ in batch)
+            deadline = time.monotonic() + self.flush_interval
+            while size < self.max_batch_bytes:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    group = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                groups += 1
+                batch.extend(group)
+                size += sum(len(line) for _, line, _ in group)
+
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in range(groups):
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: list[tuple[Path, bytes, int]]) -> None:
+        """Write a batch of records, one append per file."""
+        by_file: dict[Path, tuple[list[bytes], int]] = {}
+        for filepath, line, max_items in batch:
+            by_file.setdefault(filepath, ([], max_items))[0].append(line)
+
+        for filepath, (lines, max_items) in by_file.items():
+            try:
+                _append_lines(filepath, lines, max_items)
+            except Exception as e:
+                logging.error(f"Error appending to {filepath.name}: {e}")
+
+
+# Shared writer for audit and incident logs
+audit_writer = AuditWriter()
+atexit.register(audit_writer.flush)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=audit_writer._reset_after_fork)
+
+# JSONL files already checked for a legacy JSON array to import
+_legacy_checked: set[Path] = set()
+
+
+def _import_legacy_json(filepath: Path) -> None:
+    """Import a legacy JSON array log into its JSON Lines file, once.
+
+    Logs used to be stored as a single JSON array (e.g. audit_log.json).
+    If such a file sits next to the JSONL log, its items are written
+    ahead of the existing lines and it is renamed to ``*.json.migrated``
+    so it is not imported again.
+    """
+    if filepath in _legacy_checked:
+        return
+    _legacy_checked.add(filepath)
+
+    legacy = filepath.with_suffix(".json")
+    if not legacy.exists():
+        return
+
+    try:
+        with open(legacy, "rb") as f:
+            items = _json_loads(f.read())
+        if not isinstance(items, list):
+            logging.error(f"Error importing {legacy.name}: expected a JSON array")
+            return
+        existing = filepath.read_bytes() if filepath.exists() else b""
+        _atomic_write(filepath, b"".join(_encode_jsonl(i) for i in items) + existing)
+        legacy.rename(legacy.with_name(legacy.name + ".migrated"))
+        logging.info(f"Imported {len(items)} entries from {legacy.name} into {filepath.name}")
+    except Exception as e:
+        logging.error(f"Error importing {legacy.name}: {e}")
+
+
+def load_jsonl(filename: str) -> list[Any]:
+    """Load all items from a JSON Lines file.
+
+    The file is memory-mapped so lines are parsed straight from the page
+    cache without copying the whole file into a buffer first. Lines that
+    cannot be parsed (e.g. a partial write) are skipped. A legacy JSON
+    array file of the same name is imported on first load.
+
+    Args:
+        filename: Name of the file in the data directory
+
+    Returns:
+        List of items in file order (oldest first)
+    """
+    # Make sure writes queued on the background writer are on disk
+    audit_writer.flush()
+
+    ensure_data_dir()
+    filepath = DATA_DIR / filename
+    _import_legacy_json(filepath)
+
+    if not filepath.exists():
+        return []
+
+    items = []
+    try:
+        with open(filepath, "rb") as f:
+            # mmap cannot map an empty file
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for line in iter(mm.readline, b""):
+                    if not line.strip():
+                        continue
+                    try:
+                        items.append(_json_loads(line))
+                    except json.JSONDecodeError:
+                        continue
+    except Exception as e:
+        logging.error(f"Error loading {filename}: {e}")
+    return items
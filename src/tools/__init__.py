@@ -4,12 +4,21 @@ This file is automatically managed by the tool loading system.
 Tools are auto-discovered from .py files in this directory.
 """
 
-from .validate_action import validate_action
-from .register_agent import register_agent
-from .create_policy import create_policy
-from .get_audit_log import get_audit_log
-from .get_compliance_status import get_compliance_status
-from .report_incident import report_incident
+import sys
+from pathlib import Path
+
+# Tool modules import the core package as top-level "core" (the server
+# entry point puts src/ on sys.path); make that work for package imports
+_src_dir = str(Path(__file__).parent.parent)
+if _src_dir not in sys.path:
+    sys.path.insert(0, _src_dir)
+
+from .validate_action import validate_action  # noqa: E402
+from .register_agent import register_agent  # noqa: E402
+from .create_policy import create_policy  # noqa: E402
+from .get_audit_log import get_audit_log  # noqa: E402
+from .get_compliance_status import get_compliance_status  # noqa: E402
+from .report_incident import report_incident  # noqa: E402
 
 __all__ = [
     "validate_action",
@@ -4,34 +4,24 @@ Policies control what agents can and cannot do. They are evaluated
 by the validate_action tool before any action is performed.
 """
 
+import bisect
 import json
-import sys
-from pathlib import Path
 from typing import Any
 
-# Handle imports for both server runtime and test contexts
-_src_dir = Path(__file__).parent.parent
-if str(_src_dir) not in sys.path:
-    sys.path.insert(0, str(_src_dir))
+from core.server import mcp
+from core.utils import (
+    AuditEntry,
+    audit_writer,
+    dumps_response,
+    generate_id,
+    get_timestamp,
+    load_policies,
+    loads_json,
+    save_policies,
+)
 
-try:
-    from core.server import mcp
-    from core.utils import (
-        generate_id,
-        get_timestamp,
-        load_json_file,
-        save_json_file,
-        append_to_json_list,
-    )
-except ImportError:
-    from src.core.server import mcp
-    from src.core.utils import (
-        generate_id,
-        get_timestamp,
-        load_json_file,
-        save_json_file,
-        append_to_json_list,
-    )
+
+_VALID_ACTIONS = frozenset({"allow", "deny", "require_approval"})
 
 
 def _validate_policy_rules(rules: list[dict[str, Any]]) -> tuple[bool, str]:
@@ -43,8 +33,6 @@ def _validate_policy_rules(rules: list[dict[str, Any]]) -> tuple[bool, str]:
     if not rules:
         return False, "Policy must have at least one rule"
     
-    valid_actions = ["allow", "deny", "require_approval"]
-    
     for i, rule in enumerate(rules):
         if not isinstance(rule, dict):
             return False, f"Rule {i} must be an object"
@@ -54,8 +42,8 @@ def _validate_policy_rules(rules: list[dict[str, Any]]) -> tuple[bool, str]:
             return False, f"Rule {i} must have a 'condition' object"
         
         action = rule.get("action", "deny")
-        if action not in valid_actions:
-            return False, f"Rule {i} has invalid action '{action}'. Must be one of: {valid_actions}"
+        if not isinstance(action, str) or action not in _VALID_ACTIONS:
+            return False, f"Rule {i} has invalid action '{action}'. Must be one of: {sorted(_VALID_ACTIONS)}"
     
     return True, ""
 
@@ -65,7 +53,7 @@ def create_policy(
     policy_id: str,
     name: str,
     description: str,
-    rules: str,
+    rules: str | list[dict[str, Any]],
     priority: int = 100,
     enabled: bool = True,
 ) -> str:
@@ -78,7 +66,8 @@ def create_policy(
         policy_id: Unique identifier for the policy (e.g., "prod-db-access")
         name: Human-readable name (e.g., "Production Database Access Control")
         description: Description of what this policy controls
-        rules: JSON array of rule objects. Each rule has:
+        rules: Array of rule objects, or the same array as a JSON string.
+            Each rule has:
             - condition: Object with matching criteria
                 - tool_pattern: Glob pattern for tool names (e.g., "database_*")
                 - action_type: Type of action (e.g., "tool_call")
@@ -105,35 +94,33 @@ def create_policy(
     """
     timestamp = get_timestamp()
     
-    # Parse rules JSON
-    try:
-        rules_list = json.loads(rules) if rules else []
-    except json.JSONDecodeError as e:
-        return json.dumps({
-            "success": False,
-            "policy_id": policy_id,
-            "message": f"Invalid rules JSON: {e}",
-        }, indent=2)
+    # Parse rules JSON (already-decoded lists are used as-is)
+    if isinstance(rules, list):
+        rules_list = rules
+    else:
+        try:
+            rules_list = loads_json(rules) if rules else []
+        except json.JSONDecodeError as e:
+            return dumps_response({
+                "success": False,
+                "policy_id": policy_id,
+                "message": f"Invalid rules JSON: {e}",
+            })
     
     # Validate rules
     is_valid, error_msg = _validate_policy_rules(rules_list)
     if not is_valid:
-        return json.dumps({
+        return dumps_response({
             "success": False,
             "policy_id": policy_id,
             "message": f"Invalid policy rules: {error_msg}",
-        }, indent=2)
+        })
     
     # Load existing policies
-    policies = load_json_file("policies.json", default=[])
+    policies, id_index = load_policies()
     
     # Check if policy already exists
-    existing_idx = None
-    for i, p in enumerate(policies):
-        if p.get("id") == policy_id:
-            existing_idx = i
-            break
-    
+    existing_idx = id_index.get(policy_id)
     is_update = existing_idx is not None
     
     # Create policy record
@@ -148,23 +135,27 @@ def create_policy(
         "updated_at": timestamp,
     }
     
-    # Save policy
-    if is_update:
+    # Save policy, keeping the list sorted by priority (higher first).
+    # Ties keep list order, as a stable sort would: an updated policy that
+    # moves down to an existing tier goes before that tier's policies,
+    # anything else after them.
+    old_priority = policies[existing_idx].get("priority", 0) if is_update else None
+    if is_update and old_priority == priority:
         policies[existing_idx] = policy_record
     else:
-        policies.append(policy_record)
-    
-    # Sort by priority (higher first)
-    policies.sort(key=lambda p: p.get("priority", 0), reverse=True)
+        if is_update:
+            del policies[existing_idx]
+        insort = bisect.insort_left if is_update and priority < old_priority else bisect.insort_right
+        insort(policies, policy_record, key=lambda p: -p.get("priority", 0))
     
-    save_json_file("policies.json", policies)
+    save_policies(policies)
     
     # Log the policy creation
-    audit_entry = {
-        "entry_id": generate_id("aud"),
-        "timestamp": timestamp,
-        "agent_id": "guardian-system",
-        "action": {
+    audit_entry = AuditEntry(
+        entry_id=generate_id("aud"),
+        timestamp=timestamp,
+        agent_id="guardian-system",
+        action={
             "type": "policy_management",
             "target": policy_id,
             "parameters": {
@@ -173,16 +164,16 @@ def create_policy(
                 "enabled": enabled,
             },
         },
-        "evaluation": {
+        evaluation={
             "allowed": True,
             "reason": "Policy management completed",
         },
-    }
-    append_to_json_list("audit_log.json", audit_entry)
+    )
+    audit_writer.put("audit_log.jsonl", audit_entry)
     
     action = "updated" if is_update else "created"
-    return json.dumps({
+    return dumps_response({
         "success": True,
         "policy_id": policy_id,
         "message": f"Policy '{name}' ({policy_id}) {action} successfully with {len(rules_list)} rules",
-    }, indent=2)
+    })
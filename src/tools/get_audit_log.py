@@ -4,23 +4,36 @@ The audit log contains records of all validation requests, policy violations,
 and administrative actions for compliance reporting and incident investigation.
 """
 
-import json
-import sys
+import functools
 from datetime import datetime, timedelta, timezone
-from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
-# Handle imports for both server runtime and test contexts
-_src_dir = Path(__file__).parent.parent
-if str(_src_dir) not in sys.path:
-    sys.path.insert(0, str(_src_dir))
+from core.server import mcp
+from core.utils import dumps_response, entries_since, load_jsonl, public_entry
 
-try:
-    from core.server import mcp
-    from core.utils import load_json_file
-except ImportError:
-    from src.core.server import mcp
-    from src.core.utils import load_json_file
+
+# Time range suffix -> timedelta keyword
+_TIME_SUFFIXES = {"h": "hours", "d": "days", "m": "minutes"}
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_range_delta(time_range: str) -> Optional[timedelta]:
+    """Parse a time range string like "24h" into a timedelta.
+    
+    Results are cached since callers pass a handful of fixed ranges.
+    
+    Returns:
+        Duration of the range or None if invalid
+    """
+    time_range = time_range.strip().lower()
+    unit = _TIME_SUFFIXES.get(time_range[-1:])
+    if unit is None:
+        return None
+    
+    try:
+        return timedelta(**{unit: int(time_range[:-1])})
+    except (ValueError, OverflowError):
+        return None
 
 
 def _parse_time_range(time_range: str) -> Optional[datetime]:
@@ -35,23 +48,21 @@ def _parse_time_range(time_range: str) -> Optional[datetime]:
     if not time_range:
         return None
     
-    time_range = time_range.strip().lower()
-    now = datetime.now(timezone.utc)
+    delta = _parse_range_delta(time_range)
+    if delta is None:
+        return None
     
     try:
-        if time_range.endswith("h"):
-            hours = int(time_range[:-1])
-            return now - timedelta(hours=hours)
-        elif time_range.endswith("d"):
-            days = int(time_range[:-1])
-            return now - timedelta(days=days)
-        elif time_range.endswith("m"):
-            minutes = int(time_range[:-1])
-            return now - timedelta(minutes=minutes)
-    except (ValueError, IndexError):
+        return datetime.now(timezone.utc) - delta
+    except OverflowError:
+        # Range reaches past datetime.min: no cutoff
         return None
-    
-    return None
+
+
+def _entry_allowed(entry: dict[str, Any]) -> bool:
+    """Whether an audit entry's evaluation allowed the action."""
+    evaluation = entry.get("evaluation")
+    return evaluation.get("allowed", True) if evaluation else True
 
 
 def _filter_entries(
@@ -60,42 +71,44 @@ def _filter_entries(
     action_type: Optional[str],
     cutoff: Optional[datetime],
     status: Optional[str],
-) -> list[dict[str, Any]]:
-    """Filter audit entries based on criteria."""
+    limit: int,
+) -> tuple[list[dict[str, Any]], int]:
+    """Filter audit entries based on criteria.
+    
+    Returns:
+        Tuple of (up to `limit` matching entries, most recent first,
+        total number of matching entries)
+    """
+    # Build checks only for the filters that are set; the status check is
+    # the cheapest, so it runs first
+    predicates: list[Callable[[dict[str, Any]], bool]] = []
+    if status == "denied":
+        predicates.append(lambda e: not _entry_allowed(e))
+    elif status == "allowed":
+        predicates.append(_entry_allowed)
+    if agent_id:
+        predicates.append(lambda e: e.get("agent_id") == agent_id)
+    if action_type:
+        predicates.append(lambda e: (e.get("action") or {}).get("type") == action_type)
+    
     filtered = []
+    total = 0
     
-    for entry in entries:
-        # Filter by agent
-        if agent_id and entry.get("agent_id") != agent_id:
-            continue
-        
-        # Filter by action type
-        action = entry.get("action", {})
-        if action_type and action.get("type") != action_type:
+    # Entries are appended in time order, so skip straight to the cutoff.
+    # Entries without a valid timestamp only match when there is no cutoff.
+    if cutoff:
+        entries = entries_since(entries, cutoff.timestamp())
+    
+    # Walk newest to oldest so results come out sorted without a sort
+    for entry in reversed(entries):
+        if predicates and not all(p(entry) for p in predicates):
             continue
         
-        # Filter by time
-        if cutoff:
-            timestamp_str = entry.get("timestamp", "")
-            try:
-                entry_time = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
-                if entry_time < cutoff:
-                    continue
-            except (ValueError, AttributeError):
-                pass
-        
-        # Filter by status (allowed/denied)
-        if status:
-            evaluation = entry.get("evaluation", {})
-            entry_allowed = evaluation.get("allowed", True)
-            if status == "denied" and entry_allowed:
-                continue
-            if status == "allowed" and not entry_allowed:
-                continue
-        
-        filtered.append(entry)
+        total += 1
+        if len(filtered) < limit:
+            filtered.append(entry)
     
-    return filtered
+    return filtered, total
 
 
 @mcp.tool()
@@ -110,6 +123,8 @@ def get_audit_log(
     
     The audit log records all action validations, policy violations,
     and administrative actions performed through Guardian Agent.
+    Entries without a valid timestamp (e.g. imported from an old log)
+    are only returned when time_range is empty.
     
     Args:
         agent_id: Filter by specific agent ID (optional)
@@ -134,27 +149,21 @@ def get_audit_log(
         get_audit_log(agent_id="prod-agent-01", time_range="7d")
     """
     # Load audit log
-    all_entries = load_json_file("audit_log.json", default=[])
+    all_entries = load_jsonl("audit_log.jsonl")
     
     # Parse time range
     cutoff = _parse_time_range(time_range)
     
-    # Apply filters
-    filtered = _filter_entries(
+    # Apply filters and limit (most recent first)
+    limited, total = _filter_entries(
         entries=all_entries,
         agent_id=agent_id or None,
         action_type=action_type or None,
         cutoff=cutoff,
         status=status or None,
+        limit=limit,
     )
     
-    # Sort by timestamp (most recent first)
-    filtered.sort(key=lambda e: e.get("timestamp", ""), reverse=True)
-    
-    # Apply limit
-    total = len(filtered)
-    limited = filtered[:limit]
-    
     # Build response
     filters = []
     if agent_id:
@@ -164,10 +173,10 @@ def get_audit_log(
     if status:
         filters.append(f"status={status}")
     
-    return json.dumps({
-        "entries": limited,
+    return dumps_response({
+        "entries": [public_entry(e) for e in limited],
         "count": len(limited),
         "total": total,
         "time_range": time_range,
         "filters_applied": filters if filters else ["none"],
-    }, indent=2)
+    })
@@ -4,77 +4,62 @@ Provides an overview of security posture, policy violations, and compliance
 metrics for regulatory reporting (SOC2, HIPAA, etc.).
 """
 
-import json
-import sys
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta, timezone
-from pathlib import Path
 from typing import Any
 
-# Handle imports for both server runtime and test contexts
-_src_dir = Path(__file__).parent.parent
-if str(_src_dir) not in sys.path:
-    sys.path.insert(0, str(_src_dir))
-
-try:
-    from core.server import mcp
-    from core.utils import load_json_file
-except ImportError:
-    from src.core.server import mcp
-    from src.core.utils import load_json_file
+from core.server import mcp
+from core.utils import (
+    dumps_response,
+    entries_since,
+    load_agents,
+    load_jsonl,
+    load_policies,
+    public_entry,
+)
 
 
 def _calculate_metrics(
     entries: list[dict[str, Any]],
-    time_range_hours: int,
+    cutoff_epoch: float,
 ) -> dict[str, Any]:
-    """Calculate compliance metrics from audit entries."""
-    now = datetime.now(timezone.utc)
-    cutoff = now - timedelta(hours=time_range_hours)
-    
-    # Filter to time range
-    recent_entries = []
-    for entry in entries:
-        try:
-            ts = datetime.fromisoformat(entry.get("timestamp", "").replace("Z", "+00:00"))
-            if ts >= cutoff:
-                recent_entries.append(entry)
-        except (ValueError, AttributeError):
-            pass
-    
-    # Calculate stats
+    """Calculate compliance metrics from audit entries after a cutoff."""
+    # Entries are appended in time order, so skip straight to the cutoff
+    recent_entries = entries_since(entries, cutoff_epoch)
+    
+    # Single pass tallying per agent/action type.
+    # Counters are [allowed, denied] slots.
+    agent_stats: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+    action_stats: dict[str, list[int]] = defaultdict(lambda: [0, 0])
     total = len(recent_entries)
-    allowed = sum(1 for e in recent_entries if e.get("evaluation", {}).get("allowed", True))
-    denied = total - allowed
-    
-    # Group by agent
-    agent_stats = {}
+    allowed = 0
     for entry in recent_entries:
-        agent_id = entry.get("agent_id", "unknown")
-        if agent_id not in agent_stats:
-            agent_stats[agent_id] = {"allowed": 0, "denied": 0}
-        if entry.get("evaluation", {}).get("allowed", True):
-            agent_stats[agent_id]["allowed"] += 1
+        evaluation = entry.get("evaluation")
+        entry_allowed = evaluation.get("allowed", True) if evaluation else True
+        if entry_allowed:
+            allowed += 1
+            slot = 0
         else:
-            agent_stats[agent_id]["denied"] += 1
+            slot = 1
+        action = entry.get("action")
+        action_type = action.get("type", "unknown") if action else "unknown"
+        agent_stats[entry.get("agent_id", "unknown")][slot] += 1
+        action_stats[action_type][slot] += 1
+    
+    denied = total - allowed
     
     # Find top offenders
     offenders = [
-        {"agent_id": aid, "violations": stats["denied"]}
-        for aid, stats in agent_stats.items()
-        if stats["denied"] > 0
+        {"agent_id": aid, "violations": counts[1]}
+        for aid, counts in agent_stats.items()
+        if counts[1] > 0
     ]
     offenders.sort(key=lambda x: x["violations"], reverse=True)
     
-    # Group by action type
-    action_breakdown = {}
-    for entry in recent_entries:
-        action_type = entry.get("action", {}).get("type", "unknown")
-        if action_type not in action_breakdown:
-            action_breakdown[action_type] = {"allowed": 0, "denied": 0}
-        if entry.get("evaluation", {}).get("allowed", True):
-            action_breakdown[action_type]["allowed"] += 1
-        else:
-            action_breakdown[action_type]["denied"] += 1
+    action_breakdown = {
+        action_type: {"allowed": counts[0], "denied": counts[1]}
+        for action_type, counts in action_stats.items()
+    }
     
     return {
         "total_actions": total,
@@ -121,15 +106,17 @@ def get_compliance_status(
     # Parse time range
     time_map = {"1h": 1, "24h": 24, "7d": 168, "30d": 720}
     hours = time_map.get(time_range, 24)
+    now = datetime.now(timezone.utc)
+    cutoff_epoch = (now - timedelta(hours=hours)).timestamp()
     
     # Load data
-    audit_entries = load_json_file("audit_log.json", default=[])
-    incidents = load_json_file("incidents.json", default=[])
-    policies = load_json_file("policies.json", default=[])
-    agents = load_json_file("agents.json", default={})
+    audit_entries = load_jsonl("audit_log.jsonl")
+    incidents = load_jsonl("incidents.jsonl")
+    policies, _ = load_policies()
+    agents = load_agents()
     
     # Calculate metrics
-    metrics = _calculate_metrics(audit_entries, hours)
+    metrics = _calculate_metrics(audit_entries, cutoff_epoch)
     
     # Determine overall status
     denial_rate = metrics["denial_rate"]
@@ -148,7 +135,7 @@ def get_compliance_status(
         "status": status,
         "status_message": status_message,
         "time_range": time_range,
-        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "generated_at": now.isoformat(),
         "metrics": metrics,
         "recommendations": [],
     }
@@ -165,7 +152,21 @@ def get_compliance_status(
             "No security policies defined - create policies using create_policy tool"
         )
     
-    enabled_policies = sum(1 for p in policies if p.get("enabled", True))
+    # Count enabled policies and build the summary list in one pass
+    enabled_policies = 0
+    policy_list = []
+    for p in policies:
+        enabled = p.get("enabled", True)
+        if enabled:
+            enabled_policies += 1
+        if include_policy_summary:
+            policy_list.append({
+                "id": p.get("id"),
+                "name": p.get("name"),
+                "enabled": enabled,
+                "rules_count": len(p.get("rules", [])),
+            })
+    
     if enabled_policies == 0:
         report["recommendations"].append(
             "No policies are enabled - enable policies to enforce security"
@@ -173,31 +174,20 @@ def get_compliance_status(
     
     # Include incidents if requested
     if include_incidents:
-        # Get recent incidents
-        now = datetime.now(timezone.utc)
-        cutoff = now - timedelta(hours=hours)
-        recent_incidents = []
-        
-        for inc in incidents:
-            try:
-                ts = datetime.fromisoformat(inc.get("timestamp", "").replace("Z", "+00:00"))
-                if ts >= cutoff:
-                    recent_incidents.append(inc)
-            except (ValueError, AttributeError):
-                pass
+        # Get recent incidents, most recent first (the log is append-ordered)
+        recent_incidents = entries_since(incidents, cutoff_epoch)
+        recent_incidents.reverse()
         
-        # Sort by timestamp
-        recent_incidents.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+        by_severity = {"critical": 0, "high": 0, "medium": 0, "low": 0}
+        for inc in recent_incidents:
+            severity = inc.get("severity")
+            if severity in by_severity:
+                by_severity[severity] += 1
         
         report["incidents"] = {
             "total": len(recent_incidents),
-            "by_severity": {
-                "critical": sum(1 for i in recent_incidents if i.get("severity") == "critical"),
-                "high": sum(1 for i in recent_incidents if i.get("severity") == "high"),
-                "medium": sum(1 for i in recent_incidents if i.get("severity") == "medium"),
-                "low": sum(1 for i in recent_incidents if i.get("severity") == "low"),
-            },
-            "recent": recent_incidents[:10],
+            "by_severity": by_severity,
+            "recent": [public_entry(i) for i in recent_incidents[:10]],
         }
     
     # Include policy summary if requested
@@ -206,27 +196,17 @@ def get_compliance_status(
             "total": len(policies),
             "enabled": enabled_policies,
             "disabled": len(policies) - enabled_policies,
-            "list": [
-                {
-                    "id": p.get("id"),
-                    "name": p.get("name"),
-                    "enabled": p.get("enabled", True),
-                    "rules_count": len(p.get("rules", [])),
-                }
-                for p in policies
-            ],
+            "list": policy_list,
         }
     
     # Add agent summary
+    trust_counts = Counter(a.get("trust_level") for a in agents.values())
     report["agents"] = {
         "total": len(agents),
         "by_trust_level": {
-            "admin": sum(1 for a in agents.values() if a.get("trust_level") == "admin"),
-            "high": sum(1 for a in agents.values() if a.get("trust_level") == "high"),
-            "medium": sum(1 for a in agents.values() if a.get("trust_level") == "medium"),
-            "low": sum(1 for a in agents.values() if a.get("trust_level") == "low"),
+            level: trust_counts[level] for level in ("admin", "high", "medium", "low")
         },
         "suspended": sum(1 for a in agents.values() if a.get("status") == "suspended"),
     }
     
-    return json.dumps(report, indent=2)
+    return dumps_response(report)
@@ -4,34 +4,26 @@ Agents must be registered to get proper trust levels and permissions.
 Unregistered agents are auto-registered with 'low' trust level.
 """
 
-import json
-import sys
-from pathlib import Path
-from typing import Optional
+from core.server import mcp
+from core.utils import (
+    AuditEntry,
+    audit_writer,
+    dumps_response,
+    generate_id,
+    get_timestamp,
+    load_agents,
+    safe_loads_json,
+    save_agents,
+)
 
-# Handle imports for both server runtime and test contexts
-_src_dir = Path(__file__).parent.parent
-if str(_src_dir) not in sys.path:
-    sys.path.insert(0, str(_src_dir))
 
-try:
-    from core.server import mcp
-    from core.utils import (
-        generate_id,
-        get_timestamp,
-        load_json_file,
-        save_json_file,
-        append_to_json_list,
-    )
-except ImportError:
-    from src.core.server import mcp
-    from src.core.utils import (
-        generate_id,
-        get_timestamp,
-        load_json_file,
-        save_json_file,
-        append_to_json_list,
-    )
+# Trust levels from least to most privileged
+_TRUST_LEVELS = ("low", "medium", "high", "admin")
+_VALID_TRUST_LEVELS = frozenset(_TRUST_LEVELS)
+
+# Registration warnings (static text)
+_ADMIN_WARNING = "Agent registered with ADMIN trust level - has full access"
+_NO_RESTRICTIONS_WARNING = "No tool restrictions defined - agent can use any tool per policies"
 
 
 @mcp.tool()
@@ -78,39 +70,29 @@ def register_agent(
     timestamp = get_timestamp()
     
     # Parse JSON inputs
-    try:
-        allowed_list = json.loads(allowed_tools) if allowed_tools else []
-    except json.JSONDecodeError:
-        allowed_list = []
-        
-    try:
-        denied_list = json.loads(denied_tools) if denied_tools else []
-    except json.JSONDecodeError:
-        denied_list = []
-        
-    try:
-        meta = json.loads(metadata) if metadata else {}
-    except json.JSONDecodeError:
-        meta = {}
+    allowed_list = safe_loads_json(allowed_tools, [])
+    denied_list = safe_loads_json(denied_tools, [])
+    meta = safe_loads_json(metadata, {})
     
     # Validate trust level
-    valid_trust_levels = ["low", "medium", "high", "admin"]
-    if trust_level not in valid_trust_levels:
-        return json.dumps({
+    if trust_level not in _VALID_TRUST_LEVELS:
+        return dumps_response({
             "success": False,
             "agent_id": agent_id,
-            "message": f"Invalid trust level '{trust_level}'. Must be one of: {valid_trust_levels}",
+            "message": f"Invalid trust level '{trust_level}'. Must be one of: {list(_TRUST_LEVELS)}",
             "warnings": [],
-        }, indent=2)
+        })
     
     # Load existing agents
-    agents = load_json_file("agents.json", default={})
+    agents = load_agents()
     
     # Check if agent already exists
-    is_update = agent_id in agents
+    existing = agents.get(agent_id)
+    is_update = existing is not None
     
-    # Create/update agent record
-    agent_record = {
+    # Create/update agent record. It is rebuilt rather than updated in
+    # place so fields not set here (e.g. a previous suspension) are dropped.
+    agents[agent_id] = {
         "agent_id": agent_id,
         "name": name,
         "description": description,
@@ -119,21 +101,20 @@ def register_agent(
         "denied_tools": denied_list,
         "metadata": meta,
         "status": "active",
-        "registered_at": agents.get(agent_id, {}).get("registered_at", timestamp),
+        "registered_at": existing.get("registered_at", timestamp) if is_update else timestamp,
         "updated_at": timestamp,
         "auto_registered": False,
     }
     
     # Save agent
-    agents[agent_id] = agent_record
-    save_json_file("agents.json", agents)
+    save_agents(agents)
     
     # Log the registration
-    audit_entry = {
-        "entry_id": generate_id("aud"),
-        "timestamp": timestamp,
-        "agent_id": "guardian-system",
-        "action": {
+    audit_entry = AuditEntry(
+        entry_id=generate_id("aud"),
+        timestamp=timestamp,
+        agent_id="guardian-system",
+        action={
             "type": "agent_registration",
             "target": agent_id,
             "parameters": {
@@ -141,24 +122,24 @@ def register_agent(
                 "is_update": is_update,
             },
         },
-        "evaluation": {
+        evaluation={
             "allowed": True,
             "reason": "Agent registration completed",
         },
-    }
-    append_to_json_list("audit_log.json", audit_entry)
+    )
+    audit_writer.put("audit_log.jsonl", audit_entry)
     
     # Build warnings
     warnings = []
     if trust_level == "admin":
-        warnings.append("Agent registered with ADMIN trust level - has full access")
+        warnings.append(_ADMIN_WARNING)
     if not allowed_list and not denied_list:
-        warnings.append("No tool restrictions defined - agent can use any tool per policies")
+        warnings.append(_NO_RESTRICTIONS_WARNING)
     
     action = "updated" if is_update else "registered"
-    return json.dumps({
+    return dumps_response({
         "success": True,
         "agent_id": agent_id,
         "message": f"Agent '{name}' ({agent_id}) {action} successfully with trust level '{trust_level}'",
         "warnings": warnings,
-    }, indent=2)
+    })
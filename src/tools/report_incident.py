@@ -4,33 +4,30 @@ Used to report security incidents, suspicious activity, or policy violations
 that require investigation or immediate action.
 """
 
-import json
-import sys
-from pathlib import Path
+from core.server import mcp
+from core.utils import (
+    AuditEntry,
+    IncidentEntry,
+    audit_writer,
+    dumps_response,
+    generate_id,
+    get_timestamp,
+    load_agents,
+    safe_loads_json,
+    save_agents,
+)
 
-# Handle imports for both server runtime and test contexts
-_src_dir = Path(__file__).parent.parent
-if str(_src_dir) not in sys.path:
-    sys.path.insert(0, str(_src_dir))
 
-try:
-    from core.server import mcp
-    from core.utils import (
-        append_to_json_list,
-        generate_id,
-        get_timestamp,
-        load_json_file,
-        save_json_file,
-    )
-except ImportError:
-    from src.core.server import mcp
-    from src.core.utils import (
-        append_to_json_list,
-        generate_id,
-        get_timestamp,
-        load_json_file,
-        save_json_file,
-    )
+_VALID_INCIDENT_TYPES = frozenset({
+    "policy_violation",
+    "suspicious_activity",
+    "unauthorized_access",
+    "rate_limit_exceeded",
+    "data_exfiltration",
+    "configuration_error",
+    "other",
+})
+_VALID_SEVERITIES = frozenset({"low", "medium", "high", "critical"})
 
 
 @mcp.tool()
@@ -87,63 +84,47 @@ def report_incident(
     incident_id = generate_id("inc")
     
     # Validate incident type
-    valid_types = [
-        "policy_violation",
-        "suspicious_activity", 
-        "unauthorized_access",
-        "rate_limit_exceeded",
-        "data_exfiltration",
-        "configuration_error",
-        "other",
-    ]
-    if incident_type not in valid_types:
+    if incident_type not in _VALID_INCIDENT_TYPES:
         incident_type = "other"
     
     # Validate severity
-    valid_severities = ["low", "medium", "high", "critical"]
-    if severity not in valid_severities:
+    if severity not in _VALID_SEVERITIES:
         severity = "medium"
     
     # Parse evidence
-    try:
-        evidence_data = json.loads(evidence) if evidence else {}
-    except json.JSONDecodeError:
-        evidence_data = {"raw": evidence}
+    evidence_data = safe_loads_json(evidence, {"raw": evidence}) if evidence else {}
     
     # Create incident record
-    incident = {
-        "incident_id": incident_id,
-        "timestamp": timestamp,
-        "type": incident_type,
-        "severity": severity,
-        "description": description,
-        "agent_id": agent_id or None,
-        "evidence": evidence_data,
-        "recommended_action": recommended_action,
-        "status": "open",
-        "resolution": None,
-    }
-    
-    # Save incident
-    append_to_json_list("incidents.json", incident)
+    incident = IncidentEntry(
+        incident_id=incident_id,
+        timestamp=timestamp,
+        type=incident_type,
+        severity=severity,
+        description=description,
+        agent_id=agent_id or None,
+        evidence=evidence_data,
+        recommended_action=recommended_action,
+        status="open",
+        resolution=None,
+    )
     
     # Auto-suspend agent for critical incidents
     agent_suspended = False
     if severity == "critical" and agent_id:
-        agents = load_json_file("agents.json", default={})
+        agents = load_agents()
         if agent_id in agents:
             agents[agent_id]["status"] = "suspended"
             agents[agent_id]["suspended_at"] = timestamp
             agents[agent_id]["suspension_reason"] = f"Auto-suspended due to critical incident: {incident_id}"
-            save_json_file("agents.json", agents)
+            save_agents(agents)
             agent_suspended = True
     
     # Log to audit trail
-    audit_entry = {
-        "entry_id": generate_id("aud"),
-        "timestamp": timestamp,
-        "agent_id": "guardian-system",
-        "action": {
+    audit_entry = AuditEntry(
+        entry_id=generate_id("aud"),
+        timestamp=timestamp,
+        agent_id="guardian-system",
+        action={
             "type": "incident_report",
             "target": incident_id,
             "parameters": {
@@ -152,23 +133,28 @@ def report_incident(
                 "related_agent": agent_id,
             },
         },
-        "evaluation": {
+        evaluation={
             "allowed": True,
             "reason": "Incident logged for investigation",
         },
-    }
-    append_to_json_list("audit_log.json", audit_entry)
+    )
+    
+    # Queue the incident and its audit entry for the background writer
+    audit_writer.put_many([
+        ("incidents.jsonl", incident),
+        ("audit_log.jsonl", audit_entry),
+    ])
     
     # Build response
     message = f"Incident '{incident_id}' logged with severity '{severity}'"
     if agent_suspended:
         message += f" - Agent '{agent_id}' has been automatically suspended"
     
-    return json.dumps({
+    return dumps_response({
         "incident_id": incident_id,
         "success": True,
         "message": message,
         "agent_suspended": agent_suspended,
         "severity": severity,
         "type": incident_type,
-    }, indent=2)
+    })
@@ -5,44 +5,85 @@ It evaluates the requested action against security policies and returns
 whether the action is allowed, denied, or requires approval.
 """
 
+import functools
+import heapq
 import re
-import sys
-from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable
 
-# Handle imports for both server runtime and test contexts
-_src_dir = Path(__file__).parent.parent
-if str(_src_dir) not in sys.path:
-    sys.path.insert(0, str(_src_dir))
+from core.server import mcp
+from core.utils import (
+    AuditEntry,
+    IncidentEntry,
+    audit_writer,
+    dumps_response,
+    generate_id,
+    get_policy_view,
+    get_timestamp,
+    load_agents,
+    new_action_id,
+    safe_loads_json,
+    save_agents_deferred,
+)
 
-try:
-    from core.server import mcp
-    from core.utils import (
-        append_to_json_list,
-        generate_id,
-        get_timestamp,
-        load_json_file,
-        save_json_file,
-    )
-except ImportError:
-    from src.core.server import mcp
-    from src.core.utils import (
-        append_to_json_list,
-        generate_id,
-        get_timestamp,
-        load_json_file,
-        save_json_file,
-    )
 
+# Trust level hierarchy
+_TRUST_LEVELS = {"low": 1, "medium": 2, "high": 3, "admin": 4}
 
-def _load_policies() -> list[dict[str, Any]]:
-    """Load active policies from storage."""
-    return load_json_file("policies.json", default=[])
+
+def _load_policy_index() -> "_PolicyIndex":
+    """Load the rule index for active policies (cached until policies change)."""
+    return get_policy_view("rule_index", _build_policy_index)
 
 
 def _load_agents() -> dict[str, Any]:
-    """Load registered agents from storage."""
-    return load_json_file("agents.json", default={})
+    """Load registered agents (cached until agents.json changes)."""
+    return load_agents()
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Convert a glob pattern (only * is special) to a regex fragment."""
+    return re.escape(pattern).replace(r"\*", ".*")
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_glob(pattern: str) -> Callable[[str], bool]:
+    """Compile a glob pattern into a case-insensitive matcher.
+    
+    Literal, "prefix*", "*suffix" and "*infix*" patterns become plain
+    string comparisons; anything else falls back to a regex.
+    """
+    if pattern == "*":
+        return lambda value: True
+    literal = pattern.strip("*").lower()
+    if "*" not in literal:
+        starts, ends = pattern.startswith("*"), pattern.endswith("*")
+        if not starts and not ends:
+            return lambda value: value.lower() == literal
+        if not starts:
+            return lambda value: value.lower().startswith(literal)
+        if not ends:
+            return lambda value: value.lower().endswith(literal)
+        return lambda value: literal in value.lower()
+    regex = re.compile(f"^{_glob_to_regex(pattern)}$", re.IGNORECASE)
+    return lambda value: regex.match(value) is not None
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_glob_list(
+    patterns: tuple[str, ...],
+) -> tuple[frozenset[str], re.Pattern[str] | None]:
+    """Split glob patterns into literal names and one alternation regex.
+    
+    Returns:
+        Lowercased literal patterns, and a regex for the patterns with
+        wildcards (None if there are none)
+    """
+    exact = frozenset(p.lower() for p in patterns if "*" not in p)
+    globs = [p for p in patterns if "*" in p]
+    if not globs:
+        return exact, None
+    alternation = "|".join(_glob_to_regex(p) for p in globs)
+    return exact, re.compile(f"^(?:{alternation})$", re.IGNORECASE)
 
 
 def _match_pattern(pattern: str, value: str) -> bool:
@@ -55,11 +96,58 @@ def _match_pattern(pattern: str, value: str) -> bool:
     Returns:
         True if pattern matches value
     """
-    if pattern == "*":
+    return _compile_glob(pattern)(value)
+
+
+def _match_any(patterns: list[str], value: str) -> bool:
+    """Check whether any of several glob patterns matches a value."""
+    exact, glob_regex = _compile_glob_list(tuple(patterns))
+    if value.lower() in exact:
         return True
-    # Convert glob pattern to regex
-    regex_pattern = pattern.replace("*", ".*")
-    return bool(re.match(f"^{regex_pattern}$", value, re.IGNORECASE))
+    return glob_regex is not None and glob_regex.match(value) is not None
+
+
+# Rules bucketed by the lowercased literal prefix of their tool_pattern,
+# plus the distinct prefix lengths to probe. Bucket entries are
+# (evaluation order, policy, rule).
+_PolicyIndex = tuple[dict[str, list[tuple[int, dict[str, Any], dict[str, Any]]]], list[int]]
+
+
+def _build_policy_index(policies: list[dict[str, Any]]) -> _PolicyIndex:
+    """Bucket the rules of enabled policies by tool_pattern prefix.
+    
+    Rules without a tool_pattern, or whose pattern starts with *, share
+    the "" bucket that every target checks.
+    """
+    buckets: dict[str, list[tuple[int, dict[str, Any], dict[str, Any]]]] = {}
+    order = 0
+    for policy in policies:
+        if not policy.get("enabled", True):
+            continue
+        for rule in policy.get("rules", []):
+            tool_pattern = (rule.get("condition") or {}).get("tool_pattern")
+            prefix = tool_pattern.split("*", 1)[0].lower() if tool_pattern else ""
+            buckets.setdefault(prefix, []).append((order, policy, rule))
+            order += 1
+    return buckets, sorted({len(prefix) for prefix in buckets})
+
+
+def _candidate_rules(
+    index: _PolicyIndex, target: str
+) -> Iterable[tuple[int, dict[str, Any], dict[str, Any]]]:
+    """Get the rules whose tool_pattern could match target, in evaluation order."""
+    buckets, lengths = index
+    target_lower = target.lower()
+    matched = []
+    for length in lengths:
+        if length > len(target_lower):
+            break
+        bucket = buckets.get(target_lower[:length])
+        if bucket is not None:
+            matched.append(bucket)
+    if len(matched) == 1:
+        return matched[0]
+    return heapq.merge(*matched)
 
 
 def _evaluate_policies(
@@ -68,7 +156,7 @@ def _evaluate_policies(
     agent_id: str,
     parameters: dict[str, Any],
     agents: dict[str, Any],
-    policies: list[dict[str, Any]],
+    policy_index: _PolicyIndex,
 ) -> dict[str, Any]:
     """Evaluate action against all active policies.
     
@@ -80,85 +168,70 @@ def _evaluate_policies(
     trust_level = agent.get("trust_level", "low")
     allowed_tools = agent.get("allowed_tools", [])
     denied_tools = agent.get("denied_tools", [])
-    
-    # Trust level hierarchy
-    trust_levels = {"low": 1, "medium": 2, "high": 3, "admin": 4}
-    agent_trust_score = trust_levels.get(trust_level, 1)
+    agent_trust_score = _TRUST_LEVELS.get(trust_level, 1)
     
     # Check agent-specific tool restrictions first
-    if denied_tools:
-        for pattern in denied_tools:
-            if _match_pattern(pattern, target):
-                return {
-                    "allowed": False,
-                    "reason": f"Tool '{target}' is explicitly denied for agent '{agent_id}'",
-                    "policy_matched": "agent_denied_tools",
-                }
+    if denied_tools and _match_any(denied_tools, target):
+        return {
+            "allowed": False,
+            "reason": f"Tool '{target}' is explicitly denied for agent '{agent_id}'",
+            "policy_matched": "agent_denied_tools",
+        }
     
     if allowed_tools and allowed_tools != ["*"]:
-        tool_allowed = False
-        for pattern in allowed_tools:
-            if _match_pattern(pattern, target):
-                tool_allowed = True
-                break
-        if not tool_allowed:
+        if not _match_any(allowed_tools, target):
             return {
                 "allowed": False,
                 "reason": f"Tool '{target}' is not in allowed list for agent '{agent_id}'",
                 "policy_matched": "agent_allowed_tools",
             }
     
-    # Evaluate each policy
-    for policy in policies:
-        if not policy.get("enabled", True):
+    # Evaluate the rules of enabled policies whose tool prefix fits target
+    for _, policy, rule in _candidate_rules(policy_index, target):
+        condition = rule.get("condition") or {}
+        action = rule.get("action", "deny")
+        policy_id = policy.get("id", "unknown")
+        
+        # Check tool pattern match
+        tool_pattern = condition.get("tool_pattern")
+        if tool_pattern and not _match_pattern(tool_pattern, target):
             continue
-            
-        rules = policy.get("rules", [])
-        for rule in rules:
-            condition = rule.get("condition", {})
-            
-            # Check tool pattern match
-            tool_pattern = condition.get("tool_pattern")
-            if tool_pattern and not _match_pattern(tool_pattern, target):
-                continue
-            
-            # Check action type match
-            action_pattern = condition.get("action_type")
-            if action_pattern and not _match_pattern(action_pattern, action_type):
-                continue
-            
-            # Check trust level requirement
-            required_trust = condition.get("trust_level_at_least")
-            if required_trust:
-                required_score = trust_levels.get(required_trust, 1)
-                if agent_trust_score < required_score:
-                    action = rule.get("action", "deny")
-                    if action == "deny":
-                        return {
-                            "allowed": False,
-                            "reason": f"Tool '{target}' requires trust level '{required_trust}', agent has '{trust_level}'",
-                            "policy_matched": policy.get("id", "unknown"),
-                        }
-            
-            # Check trust level below (for denials)
-            below_trust = condition.get("trust_level_below")
-            if below_trust:
-                below_score = trust_levels.get(below_trust, 1)
-                if agent_trust_score < below_score:
-                    action = rule.get("action", "deny")
-                    if action == "deny":
-                        return {
-                            "allowed": False,
-                            "reason": rule.get("message", f"Access denied by policy '{policy.get('id')}'"),
-                            "policy_matched": policy.get("id", "unknown"),
-                        }
-                    elif action == "require_approval":
-                        return {
-                            "allowed": False,
-                            "require_approval": True,
-                            "reason": rule.get("message", "This action requires human approval"),
-                            "policy_matched": policy.get("id", "unknown"),
-                        }
+        
+        # Check action type match
+        action_pattern = condition.get("action_type")
+        if action_pattern and not _match_pattern(action_pattern, action_type):
+            continue
+        
+        # Check trust level requirement
+        required_trust = condition.get("trust_level_at_least")
+        if required_trust:
+            required_score = _TRUST_LEVELS.get(required_trust, 1)
+            if agent_trust_score < required_score and action == "deny":
+                return {
+                    "allowed": False,
+                    "reason": f"Tool '{target}' requires trust level '{required_trust}', agent has '{trust_level}'",
+                    "policy_matched": policy_id,
+                }
+        
+        # Check trust level below (for denials)
+        below_trust = condition.get("trust_level_below")
+        if below_trust:
+            below_score = _TRUST_LEVELS.get(below_trust, 1)
+            if agent_trust_score < below_score:
+                message = rule.get("message")
+                if action == "deny":
+                    return {
+                        "allowed": False,
+                        "reason": message if message is not None else f"Access denied by policy '{policy.get('id')}'",
+                        "policy_matched": policy_id,
+                    }
+                elif action == "require_approval":
+                    return {
+                        "allowed": False,
+                        "require_approval": True,
+                        "reason": message if message is not None else "This action requires human approval",
+                        "policy_matched": policy_id,
+                    }
     
     # Default: allow if no policy denied
     return {
@@ -205,20 +278,15 @@ def validate_action(
             context="Cleanup stale records"
         )
     """
-    import json
-    
     # Parse parameters
-    try:
-        params = json.loads(parameters) if parameters else {}
-    except json.JSONDecodeError:
-        params = {}
+    params = safe_loads_json(parameters, {})
     
     # Generate action ID for audit trail
-    action_id = generate_id("act")
+    action_id = new_action_id()
     timestamp = get_timestamp()
     
     # Load data
-    policies = _load_policies()
+    policy_index = _load_policy_index()
     agents = _load_agents()
     
     # Check if agent is registered
@@ -231,7 +299,7 @@ def validate_action(
             "registered_at": timestamp,
             "auto_registered": True,
         }
-        save_json_file("agents.json", agents)
+        save_agents_deferred(agents)
     
     # Check if agent is suspended
     agent = agents.get(agent_id, {})
@@ -250,7 +318,7 @@ def validate_action(
             agent_id=agent_id,
             parameters=params,
             agents=agents,
-            policies=policies,
+            policy_index=policy_index,
         )
         
         result = {
@@ -262,38 +330,40 @@ def validate_action(
         }
     
     # Create audit log entry
-    audit_entry = {
-        "entry_id": generate_id("aud"),
-        "action_id": action_id,
-        "timestamp": timestamp,
-        "agent_id": agent_id,
-        "action": {
+    audit_entry = AuditEntry(
+        entry_id=generate_id("aud"),
+        action_id=action_id,
+        timestamp=timestamp,
+        agent_id=agent_id,
+        action={
             "type": action_type,
             "target": target,
             "parameters": params,
             "context": context,
         },
-        "evaluation": {
+        evaluation={
             "allowed": result["allowed"],
             "require_approval": result.get("require_approval", False),
             "reason": result["reason"],
         },
-    }
-    
-    # Save audit entry
-    append_to_json_list("audit_log.json", audit_entry)
+    )
     
-    # If denied, also log as potential incident
-    if not result["allowed"]:
-        incident = {
-            "incident_id": generate_id("inc"),
-            "timestamp": timestamp,
-            "type": "policy_violation",
-            "severity": "medium",
-            "agent_id": agent_id,
-            "action_id": action_id,
-            "details": f"Agent '{agent_id}' attempted '{action_type}' on '{target}' - DENIED: {result['reason']}",
-        }
-        append_to_json_list("incidents.json", incident)
+    # Save audit entry; if denied, queue it together with an incident
+    if result["allowed"]:
+        audit_writer.put("audit_log.jsonl", audit_entry)
+    else:
+        incident = IncidentEntry(
+            incident_id=generate_id("inc"),
+            timestamp=timestamp,
+            type="policy_violation",
+            severity="medium",
+            agent_id=agent_id,
+            action_id=action_id,
+            description=f"Agent '{agent_id}' attempted '{action_type}' on '{target}' - DENIED: {result['reason']}",
+        )
+        audit_writer.put_many([
+            ("audit_log.jsonl", audit_entry),
+            ("incidents.jsonl", incident),
+        ])
     
-    return json.dumps(result, indent=2)
+    return dumps_response(result)
@@ -0,0 +1,13 @@
+"""Pytest configuration for PolicyGuard tests."""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+
+def pytest_configure(config):
+    """Make the tools' top-level "core" imports and "src." imports resolvable."""
+    for path in (str(ROOT / "src"), str(ROOT)):
+        if path not in sys.path:
+            sys.path.insert(0, path)
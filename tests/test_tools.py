@@ -4,196 +4,259 @@ These tests verify the security policy logic WITHOUT requiring any LLM.
 Run with: pytest tests/test_tools.py -v
 """
 
-import importlib
-import json
+import hashlib
 import os
+import re
 import shutil
-import sys
-import tempfile
-from pathlib import Path
+import signal
+from types import SimpleNamespace
 
 import pytest
 
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-sys.path.insert(0, str(Path(__file__).parent.parent))
+# src/ is put on sys.path by conftest.py. These use orjson when installed.
+from core.utils import dumps_bytes, loads_json
+
+
+# Default data for every test. Read-only: tests mutate their own copy on
+# disk, never these objects.
+_DEFAULT_AGENTS = {
+    "test-low": {"agent_id": "test-low", "name": "Low Trust", "trust_level": "low", "status": "active", "allowed_tools": [], "denied_tools": []},
+    "test-medium": {"agent_id": "test-medium", "name": "Medium Trust", "trust_level": "medium", "status": "active", "allowed_tools": [], "denied_tools": []},
+    "test-high": {"agent_id": "test-high", "name": "High Trust", "trust_level": "high", "status": "active", "allowed_tools": [], "denied_tools": []},
+    "test-admin": {"agent_id": "test-admin", "name": "Admin", "trust_level": "admin", "status": "active", "allowed_tools": [], "denied_tools": []},
+    "test-suspended": {"agent_id": "test-suspended", "name": "Suspended", "trust_level": "medium", "status": "suspended", "allowed_tools": [], "denied_tools": []},
+}
+
+_DEFAULT_POLICIES = [
+    {
+        "id": "test-policy",
+        "name": "Test Policy",
+        "rules": [
+            {"condition": {"tool_pattern": "delete_*", "trust_level_below": "admin"}, "action": "deny", "message": "Delete requires admin"},
+            {"condition": {"tool_pattern": "read_*", "trust_level_at_least": "low"}, "action": "allow", "message": "Read allowed"},
+        ],
+        "enabled": True,
+        "priority": 100,
+    }
+]
+
+# Serialized once; the fixtures only write these bytes
+_AGENTS_BYTES = dumps_bytes(_DEFAULT_AGENTS)
+_POLICIES_BYTES = dumps_bytes(_DEFAULT_POLICIES)
+
+
+@pytest.fixture(scope="module")
+def template_data_dir(request, tmp_path_factory):
+    """Build the default data directory, reusing it across sessions.
+    
+    The template lives in the pytest cache under a name derived from its
+    contents, so it is only rebuilt when the default data changes.
+    """
+    cache = getattr(request.config, "cache", None)
+    if cache is None:
+        # Cache plugin disabled (-p no:cacheprovider)
+        template_dir = tmp_path_factory.mktemp("pg_template")
+    else:
+        key = hashlib.sha1(_AGENTS_BYTES + _POLICIES_BYTES).hexdigest()[:12]
+        template_dir = cache.mkdir(f"pg_template_{key}")
+    
+    # policies.json is written last, so its presence marks a complete
+    # template. Each file is renamed into place so that pytest-xdist
+    # workers building the same template never copy a partial file.
+    if not (template_dir / "policies.json").exists():
+        for filename, data in (
+            ("agents.json", _AGENTS_BYTES),
+            ("policies.json", _POLICIES_BYTES),
+        ):
+            partial = template_dir / f"{filename}.{os.getpid()}.tmp"
+            partial.write_bytes(data)
+            os.replace(partial, template_dir / filename)
+    
+    return template_dir
+
+
+@pytest.fixture(scope="session")
+def tools():
+    """The MCP tools, imported once per session."""
+    from src.tools import (
+        create_policy,
+        get_audit_log,
+        get_compliance_status,
+        register_agent,
+        report_incident,
+        validate_action,
+    )
+    return SimpleNamespace(
+        create_policy=create_policy,
+        get_audit_log=get_audit_log,
+        get_compliance_status=get_compliance_status,
+        register_agent=register_agent,
+        report_incident=report_incident,
+        validate_action=validate_action,
+    )
 
 
 @pytest.fixture(autouse=True)
-def setup_test_env(monkeypatch, tmp_path):
-    """Set up test environment with temporary data directory."""
+def setup_test_env(tmp_path, template_data_dir):
+    """Set up test environment with a fresh copy of the template data."""
     # Use pytest's tmp_path fixture for a fresh directory each test
     test_data_dir = tmp_path / "data"
-    test_data_dir.mkdir()
-    
-    # Set environment variable for data dir BEFORE imports
-    monkeypatch.setenv("POLICYGUARD_DATA_DIR", str(test_data_dir))
+    shutil.copytree(
+        template_data_dir, test_data_dir, ignore=shutil.ignore_patterns("*.tmp")
+    )
     
-    # Force reload of utils module to pick up new DATA_DIR
-    import src.core.utils as utils_module
+    # Point the utils module the tools use (imported as top-level "core",
+    # not "src.core") at the new directory
+    import core.utils as utils_module
     utils_module.set_data_dir(str(test_data_dir))
-    
-    # Also patch in case something cached it
-    monkeypatch.setattr("src.core.utils.DATA_DIR", test_data_dir)
-    
-    # Create empty data files
-    for filename in ["audit_log.json", "incidents.json"]:
-        filepath = test_data_dir / filename
-        with open(filepath, "w") as f:
-            json.dump([], f)
-    
-    # Create default agents
-    agents = {
-        "test-low": {"agent_id": "test-low", "name": "Low Trust", "trust_level": "low", "status": "active", "allowed_tools": [], "denied_tools": []},
-        "test-medium": {"agent_id": "test-medium", "name": "Medium Trust", "trust_level": "medium", "status": "active", "allowed_tools": [], "denied_tools": []},
-        "test-high": {"agent_id": "test-high", "name": "High Trust", "trust_level": "high", "status": "active", "allowed_tools": [], "denied_tools": []},
-        "test-admin": {"agent_id": "test-admin", "name": "Admin", "trust_level": "admin", "status": "active", "allowed_tools": [], "denied_tools": []},
-        "test-suspended": {"agent_id": "test-suspended", "name": "Suspended", "trust_level": "medium", "status": "suspended", "allowed_tools": [], "denied_tools": []},
-    }
-    with open(test_data_dir / "agents.json", "w") as f:
-        json.dump(agents, f)
-    
-    # Create test policies
-    policies = [
-        {
-            "id": "test-policy",
-            "name": "Test Policy",
-            "rules": [
-                {"condition": {"tool_pattern": "delete_*", "trust_level_below": "admin"}, "action": "deny", "message": "Delete requires admin"},
-                {"condition": {"tool_pattern": "read_*", "trust_level_at_least": "low"}, "action": "allow", "message": "Read allowed"},
-            ],
-            "enabled": True,
-            "priority": 100,
-        }
-    ]
-    with open(test_data_dir / "policies.json", "w") as f:
-        json.dump(policies, f)
+    utils_module.reset_caches()
     
     yield
 
 
-class TestValidateAction:
-    """Tests for validate_action tool."""
+def _field(result, key):
+    """Read one scalar field from a JSON tool response without parsing all of it.
     
-    def test_allow_read_for_low_trust(self):
-        """Low trust agent should be able to read."""
-        from src.tools.validate_action import validate_action
-        
-        # Access the underlying function via .fn
-        result = json.loads(validate_action.fn(
-            action_type="tool_call",
-            target="read_data",
-            agent_id="test-low",
-        ))
-        
-        assert result["allowed"] is True
+    Returns the first value stored under ``key``, so only use it for keys
+    that appear once in the response.
+    """
+    match = re.search(rf'"{key}"\s*:\s*(true|false|null|-?[\d.]+|"(?:[^"\\]|\\.)*")', result)
+    assert match, f"{key!r} not in {result}"
+    return loads_json(match.group(1))
+
+
+def _seed_audit(entries):
+    """Write audit log entries directly, in one write, instead of via tools.
     
-    def test_deny_delete_for_low_trust(self):
-        """Low trust agent should not be able to delete."""
-        from src.tools.validate_action import validate_action
-        
-        result = json.loads(validate_action.fn(
-            action_type="tool_call",
-            target="delete_records",
-            agent_id="test-low",
-        ))
-        
-        assert result["allowed"] is False
-        assert "admin" in result["reason"].lower()
+    Entries get a current timestamp and an allowed evaluation unless
+    they set their own.
+    """
+    import core.utils as utils_module
     
-    def test_allow_delete_for_admin(self):
-        """Admin agent should be able to delete."""
-        from src.tools.validate_action import validate_action
-        
-        result = json.loads(validate_action.fn(
-            action_type="tool_call",
-            target="delete_records",
-            agent_id="test-admin",
-        ))
-        
-        assert result["allowed"] is True
+    timestamp = utils_module.get_timestamp()
+    lines = [
+        dumps_bytes({
+            "entry_id": utils_module.generate_id("aud"),
+            "timestamp": timestamp,
+            "evaluation": {"allowed": True, "reason": "seeded"},
+            **entry,
+        })
+        for entry in entries
+    ]
+    (utils_module.DATA_DIR / "audit_log.jsonl").write_bytes(
+        b"".join(line + b"\n" for line in lines)
+    )
+
+
+class TestValidateAction:
+    """Tests for validate_action tool."""
     
-    def test_deny_suspended_agent(self):
-        """Suspended agent should be denied all actions."""
-        from src.tools.validate_action import validate_action
-        
-        result = json.loads(validate_action.fn(
+    @pytest.mark.parametrize(
+        "target,agent_id,expected,reason_sub",
+        [
+            # Low trust agent should be able to read
+            pytest.param("read_data", "test-low", True, None, id="allow_read_for_low_trust"),
+            # Low trust agent should not be able to delete
+            pytest.param("delete_records", "test-low", False, "admin", id="deny_delete_for_low_trust"),
+            # Admin agent should be able to delete
+            pytest.param("delete_records", "test-admin", True, None, id="allow_delete_for_admin"),
+            # Suspended agent should be denied all actions
+            pytest.param("read_data", "test-suspended", False, "suspended", id="deny_suspended_agent"),
+            # Unknown agent is auto-registered with low trust, so delete is denied
+            pytest.param("delete_records", "unknown-agent", False, None, id="auto_register_unknown_agent"),
+        ],
+    )
+    def test_validate_cases(self, tools, target, agent_id, expected, reason_sub):
+        """Actions should be allowed or denied by trust level and status."""
+        # Access the underlying function via .fn
+        result = tools.validate_action.fn(
             action_type="tool_call",
-            target="read_data",
-            agent_id="test-suspended",
-        ))
+            target=target,
+            agent_id=agent_id,
+        )
         
-        assert result["allowed"] is False
-        assert "suspended" in result["reason"].lower()
+        assert _field(result, "allowed") is expected
+        if reason_sub:
+            assert reason_sub in _field(result, "reason").lower()
     
-    def test_auto_register_unknown_agent(self):
-        """Unknown agent should be auto-registered with low trust."""
-        from src.tools.validate_action import validate_action
-        
-        result = json.loads(validate_action.fn(
-            action_type="tool_call",
-            target="delete_records",
-            agent_id="unknown-agent",
-        ))
-        
-        # Should be denied because auto-registered as low trust
-        assert result["allowed"] is False
+    def test_agent_tool_lists(self, tools):
+        """Agent allowed/denied tool patterns should be enforced."""
+        tools.register_agent.fn(
+            agent_id="test-lists",
+            name="Tool Lists",
+            trust_level="high",
+            allowed_tools='["read_*", "db.query"]',
+            denied_tools='["read_secret*"]',
+        )
+        
+        def allowed(target):
+            return _field(tools.validate_action.fn("tool_call", target, "test-lists"), "allowed")
+        
+        assert allowed("read_data") is True
+        assert allowed("READ_DATA") is True
+        assert allowed("db.query") is True
+        assert allowed("read_secrets") is False
+        assert allowed("write_data") is False
+        # "." in a pattern is literal, not a regex wildcard
+        assert allowed("dbXquery") is False
     
-    def test_action_id_generated(self):
+    def test_action_id_generated(self, tools):
         """Each validation should generate a unique action ID."""
-        from src.tools.validate_action import validate_action
+        from core.utils import new_action_id
         
-        result1 = json.loads(validate_action.fn(
+        result = tools.validate_action.fn(
             action_type="tool_call",
             target="read_data",
             agent_id="test-low",
-        ))
-        
-        result2 = json.loads(validate_action.fn(
-            action_type="tool_call",
-            target="read_data",
-            agent_id="test-low",
-        ))
+        )
         
-        assert result1["action_id"] != result2["action_id"]
-        assert result1["action_id"].startswith("act_")
+        assert _field(result, "action_id").startswith("act_")
+        # Uniqueness is a property of the generator; check it directly
+        assert len({new_action_id() for _ in range(1000)}) == 1000
 
 
 class TestRegisterAgent:
     """Tests for register_agent tool."""
     
-    def test_register_new_agent(self):
+    def test_register_new_agent(self, tools):
         """Should successfully register a new agent."""
-        from src.tools.register_agent import register_agent
-        
-        result = json.loads(register_agent.fn(
+        result = tools.register_agent.fn(
             agent_id="new-agent",
             name="New Agent",
             description="A new test agent",
             trust_level="medium",
-        ))
+        )
         
-        assert result["success"] is True
-        assert "registered" in result["message"].lower()
+        assert _field(result, "success") is True
+        assert "registered" in _field(result, "message").lower()
     
-    def test_reject_invalid_trust_level(self):
+    def test_reject_invalid_trust_level(self, tools):
         """Should reject invalid trust levels."""
-        from src.tools.register_agent import register_agent
-        
-        result = json.loads(register_agent.fn(
+        result = tools.register_agent.fn(
             agent_id="bad-agent",
             name="Bad Agent",
             trust_level="superadmin",  # Invalid
+        )
+        
+        assert _field(result, "success") is False
+        assert "invalid" in _field(result, "message").lower()
+    
+    def test_malformed_tool_lists_default_to_empty(self, tools):
+        """Should treat unparseable JSON inputs as empty."""
+        result = loads_json(tools.register_agent.fn(
+            agent_id="malformed-agent",
+            name="Malformed Agent",
+            allowed_tools="[read_*",
+            denied_tools="not json",
+            metadata="{",
         ))
         
-        assert result["success"] is False
-        assert "invalid" in result["message"].lower()
+        assert result["success"] is True
+        assert any("no tool restrictions" in w.lower() for w in result["warnings"])
     
-    def test_warn_on_admin_registration(self):
+    def test_warn_on_admin_registration(self, tools):
         """Should warn when registering admin agent."""
-        from src.tools.register_agent import register_agent
-        
-        result = json.loads(register_agent.fn(
+        result = loads_json(tools.register_agent.fn(
             agent_id="admin-agent-2",
             name="Another Admin",
             trust_level="admin",
@@ -202,67 +265,101 @@ class TestRegisterAgent:
         assert result["success"] is True
         assert len(result["warnings"]) > 0
         assert "admin" in result["warnings"][0].lower()
+    
+    def test_reregister_suspended_agent(self, tools):
+        """Re-registering should reactivate an agent and clear its suspension."""
+        import core.utils as utils_module
+        
+        tools.report_incident.fn(
+            incident_type="unauthorized_access",
+            severity="critical",
+            description="Suspend before re-registration",
+            agent_id="test-medium",
+        )
+        tools.register_agent.fn(agent_id="test-medium", name="Medium Trust", trust_level="medium")
+        
+        agent = utils_module.load_agents()["test-medium"]
+        assert agent["status"] == "active"
+        assert "suspended_at" not in agent
+        assert "suspension_reason" not in agent
+        assert _field(tools.validate_action.fn("tool_call", "read_data", "test-medium"), "allowed") is True
 
 
 class TestCreatePolicy:
     """Tests for create_policy tool."""
     
-    def test_create_valid_policy(self):
+    def test_create_valid_policy(self, tools):
         """Should create a valid policy."""
-        from src.tools.create_policy import create_policy
-        
-        rules = json.dumps([
+        rules = [
             {"condition": {"tool_pattern": "test_*"}, "action": "allow", "message": "Test allowed"}
-        ])
+        ]
         
-        result = json.loads(create_policy.fn(
+        result = tools.create_policy.fn(
             policy_id="new-policy",
             name="New Policy",
             description="A test policy",
             rules=rules,
-        ))
+        )
         
-        assert result["success"] is True
+        assert _field(result, "success") is True
     
-    def test_reject_empty_rules(self):
-        """Should reject policy with no rules."""
-        from src.tools.create_policy import create_policy
-        
-        result = json.loads(create_policy.fn(
+    def test_reject_empty_rules(self, tools):
+        """Should reject policy with no rules (passed as a JSON string)."""
+        result = tools.create_policy.fn(
             policy_id="empty-policy",
             name="Empty Policy",
             description="No rules",
             rules="[]",
-        ))
+        )
         
-        assert result["success"] is False
+        assert _field(result, "success") is False
     
-    def test_reject_invalid_action(self):
+    def test_reject_invalid_action(self, tools):
         """Should reject policy with invalid action."""
-        from src.tools.create_policy import create_policy
-        
-        rules = json.dumps([
+        rules = [
             {"condition": {"tool_pattern": "test_*"}, "action": "explode", "message": "Invalid"}
-        ])
+        ]
         
-        result = json.loads(create_policy.fn(
+        result = tools.create_policy.fn(
             policy_id="bad-policy",
             name="Bad Policy",
             description="Invalid action",
             rules=rules,
-        ))
+        )
         
-        assert result["success"] is False
+        assert _field(result, "success") is False
+
+    
+    def test_policies_kept_in_priority_order(self, tools):
+        """Created and updated policies should stay sorted by priority."""
+        rules = [{"condition": {"tool_pattern": "x_*"}, "action": "allow"}]
+        tools.create_policy.fn("order-low", "Low", "", rules, priority=10)
+        tools.create_policy.fn("order-high", "High", "", rules, priority=500)
+        
+        def order():
+            report = loads_json(tools.get_compliance_status.fn())
+            ids = [p["id"] for p in report["policies"]["list"]]
+            return [i for i in ids if i.startswith("order-")]
+        
+        assert order() == ["order-high", "order-low"]
+        
+        tools.create_policy.fn("order-low", "Low", "", rules, priority=1000)
+        assert order() == ["order-low", "order-high"]
+        
+        # Lowering a policy onto an existing tier puts it before that tier
+        tools.create_policy.fn("order-a", "A", "", rules, priority=2000)
+        tools.create_policy.fn("order-b", "B", "", rules, priority=2000)
+        tools.create_policy.fn("order-c", "C", "", rules, priority=1500)
+        tools.create_policy.fn("order-a", "A", "", rules, priority=1500)
+        assert order()[:3] == ["order-b", "order-a", "order-c"]
 
 
 class TestGetAuditLog:
     """Tests for get_audit_log tool."""
     
-    def test_get_audit_log_structure(self):
+    def test_get_audit_log_structure(self, tools):
         """Should return valid audit log structure."""
-        from src.tools.get_audit_log import get_audit_log
-        
-        result = json.loads(get_audit_log.fn())
+        result = loads_json(tools.get_audit_log.fn())
         
         # Check structure is correct
         assert "count" in result
@@ -271,52 +368,296 @@ class TestGetAuditLog:
         assert "time_range" in result
         assert isinstance(result["entries"], list)
     
-    def test_filter_by_agent(self):
+    def test_filter_by_agent(self, tools):
         """Should filter by agent ID."""
-        from src.tools.get_audit_log import get_audit_log
-        from src.tools.validate_action import validate_action
-        
-        # Create some audit entries
-        validate_action.fn("tool_call", "read_data", "test-low")
-        validate_action.fn("tool_call", "read_data", "test-medium")
+        _seed_audit([
+            {"agent_id": "test-low", "action": {"type": "tool_call", "target": "read_data"}},
+            {"agent_id": "test-medium", "action": {"type": "tool_call", "target": "read_data"}},
+        ])
         
-        result = json.loads(get_audit_log.fn(agent_id="test-low"))
+        result = loads_json(tools.get_audit_log.fn(agent_id="test-low"))
         
         # All entries should be for test-low
+        assert result["count"] == 1
         for entry in result["entries"]:
             assert entry["agent_id"] == "test-low"
+    
+    def test_filter_by_status(self, tools):
+        """Should only return denied entries when filtering by status."""
+        tools.validate_action.fn("tool_call", "read_data", "test-low")
+        tools.validate_action.fn("tool_call", "delete_records", "test-low")
+        
+        result = loads_json(tools.get_audit_log.fn(status="denied", action_type="tool_call"))
+        
+        assert result["count"] >= 1
+        for entry in result["entries"]:
+            assert entry["evaluation"]["allowed"] is False
+            assert entry["action"]["type"] == "tool_call"
+    
+    def test_limit_returns_most_recent(self, tools):
+        """Should return the newest entries first and report the full total."""
+        for target in ["read_a", "read_b", "read_c"]:
+            tools.validate_action.fn("tool_call", target, "test-high")
+        
+        result = loads_json(tools.get_audit_log.fn(agent_id="test-high", limit=2))
+        
+        assert result["count"] == 2
+        assert result["total"] >= 3
+        assert [e["action"]["target"] for e in result["entries"]] == ["read_c", "read_b"]
+        assert all("_ts_epoch" not in e for e in result["entries"])
+    
+    def test_entries_without_timestamp(self, tools):
+        """Undated entries should only match without a time range, wherever they sit."""
+        _seed_audit([
+            {"agent_id": "dated", "timestamp": "2000-01-01T00:00:00+00:00", "action": {"target": "old"}},
+            {"agent_id": "undated", "timestamp": "not a time", "action": {"target": "u1"}},
+            {"agent_id": "dated", "action": {"target": "new1"}},
+            {"agent_id": "undated", "timestamp": "", "action": {"target": "u2"}},
+            {"agent_id": "dated", "action": {"target": "new2"}},
+        ])
+        
+        def targets(time_range):
+            result = loads_json(tools.get_audit_log.fn(time_range=time_range))
+            return [e["action"]["target"] for e in result["entries"]]
+        
+        assert targets("24h") == ["new2", "new1"]
+        assert targets("") == ["new2", "u2", "new1", "u1", "old"]
+    
+    def test_imports_legacy_json_log(self, tools, capsys):
+        """A legacy audit_log.json array should be imported once."""
+        import core.utils as utils_module
+        
+        legacy = utils_module.DATA_DIR / "audit_log.json"
+        legacy.write_bytes(dumps_bytes([{
+            "entry_id": "aud_legacy",
+            "timestamp": utils_module.get_timestamp(),
+            "agent_id": "legacy-agent",
+            "action": {"type": "tool_call", "target": "read_data"},
+            "evaluation": {"allowed": True},
+        }]))
+        tools.validate_action.fn("tool_call", "read_data", "legacy-agent")
+        
+        result = loads_json(tools.get_audit_log.fn(agent_id="legacy-agent"))
+        
+        assert result["count"] == 2
+        assert result["entries"][-1]["entry_id"] == "aud_legacy"
+        assert not legacy.exists()
+        assert (utils_module.DATA_DIR / "audit_log.json.migrated").exists()
+        # stdout carries the JSON-RPC stream in stdio mode
+        assert capsys.readouterr().out == ""
+
+
+class TestGetComplianceStatus:
+    """Tests for get_compliance_status tool."""
+    
+    def test_metrics_count_recent_actions(self, tools):
+        """Metrics should reflect new allowed and denied validations."""
+        before = loads_json(tools.get_compliance_status.fn())["metrics"]
+        
+        tools.validate_action.fn("tool_call", "read_data", "test-low")
+        tools.validate_action.fn("tool_call", "delete_records", "test-low")
+        
+        after = loads_json(tools.get_compliance_status.fn())["metrics"]
+        
+        assert after["total_actions"] == before["total_actions"] + 2
+        assert after["denied_actions"] == before["denied_actions"] + 1
+        assert after["action_breakdown"]["tool_call"]["denied"] >= 1
+        assert any(o["agent_id"] == "test-low" for o in after["top_offenders"])
+    
+    def test_incidents_by_severity(self, tools):
+        """Recent incidents should be counted by severity."""
+        before = loads_json(tools.get_compliance_status.fn())["incidents"]
+        
+        tools.report_incident.fn(
+            incident_type="suspicious_activity",
+            severity="high",
+            description="Compliance test incident",
+        )
+        
+        after = loads_json(tools.get_compliance_status.fn())["incidents"]
+        
+        assert after["total"] == before["total"] + 1
+        assert after["by_severity"]["high"] == before["by_severity"]["high"] + 1
+        assert after["recent"][0]["description"] == "Compliance test incident"
+        assert "_ts_epoch" not in after["recent"][0]
+    
+    def test_imports_legacy_incidents(self, tools):
+        """A legacy incidents.json array should count as recent incidents."""
+        import core.utils as utils_module
+        
+        (utils_module.DATA_DIR / "incidents.json").write_bytes(dumps_bytes([{
+            "incident_id": "inc_legacy",
+            "timestamp": utils_module.get_timestamp(),
+            "type": "other",
+            "severity": "critical",
+            "agent_id": None,
+            "description": "Legacy incident",
+        }]))
+        
+        incidents = loads_json(tools.get_compliance_status.fn())["incidents"]
+        
+        assert incidents["by_severity"]["critical"] == 1
+        assert incidents["recent"][0]["incident_id"] == "inc_legacy"
 
 
 class TestReportIncident:
     """Tests for report_incident tool."""
     
-    def test_report_incident(self):
+    def test_report_incident(self, tools):
         """Should successfully report an incident."""
-        from src.tools.report_incident import report_incident
-        
-        result = json.loads(report_incident.fn(
+        result = tools.report_incident.fn(
             incident_type="suspicious_activity",
             severity="high",
             description="Test incident",
             agent_id="test-low",
-        ))
+        )
         
-        assert result["success"] is True
-        assert result["incident_id"].startswith("inc_")
+        assert _field(result, "success") is True
+        assert _field(result, "incident_id").startswith("inc_")
     
-    def test_auto_suspend_on_critical(self):
+    def test_auto_suspend_on_critical(self, tools):
         """Should auto-suspend agent on critical incident."""
-        from src.tools.report_incident import report_incident
-        
-        result = json.loads(report_incident.fn(
+        result = tools.report_incident.fn(
             incident_type="unauthorized_access",
             severity="critical",
             description="Critical security breach",
             agent_id="test-medium",
-        ))
+        )
         
-        assert result["success"] is True
-        assert result["agent_suspended"] is True
+        assert _field(result, "success") is True
+        assert _field(result, "agent_suspended") is True
+    
+    def test_lone_surrogates_are_logged(self, tools):
+        """Strings orjson cannot encode should still be logged and returned."""
+        tools.validate_action.fn("tool_call", "read_\ud800", "test-low")
+        result = tools.report_incident.fn("other", "low", "d\ud800")
+        
+        assert _field(result, "success") is True
+        entries = loads_json(tools.get_audit_log.fn(agent_id="test-low"))["entries"]
+        assert entries[-1]["action"]["target"] == "read_\ud800"
+        recent = loads_json(tools.get_compliance_status.fn())["incidents"]["recent"]
+        assert recent[0]["description"] == "d\ud800"
+
+
+class TestStorage:
+    """Tests for JSON storage helpers."""
+    
+    def test_jsonl_append_and_trim(self, tmp_path):
+        """Appends should be readable back and trimmed to max_items."""
+        import core.utils as utils_module
+        utils_module.set_data_dir(str(tmp_path))
+        
+        for i in range(7):
+            assert utils_module.append_jsonl("events.jsonl", {"n": i}, max_items=3)
+        
+        items = utils_module.load_jsonl("events.jsonl")
+        assert [item["n"] for item in items][-3:] == [4, 5, 6]
+        assert len(items) < 7
+    
+    def test_jsonl_trim_across_restarts(self, tmp_path):
+        """Lines written by an earlier process should count towards the trim."""
+        import core.utils as utils_module
+        utils_module.set_data_dir(str(tmp_path))
+        
+        # Left by a previous process, which never reached its trim
+        (tmp_path / "events.jsonl").write_bytes(
+            b"".join(dumps_bytes({"n": i}) + b"\n" for i in range(8))
+        )
+        assert utils_module.append_jsonl("events.jsonl", {"n": 8}, max_items=5)
+        
+        items = utils_module.load_jsonl("events.jsonl")
+        assert [item["n"] for item in items] == [4, 5, 6, 7, 8]
+    
+    def test_reset_caches_rechecks_legacy_logs(self, tmp_path):
+        """A legacy log added after a reset should still be imported."""
+        import core.utils as utils_module
+        utils_module.set_data_dir(str(tmp_path))
+        
+        assert utils_module.load_jsonl("events.jsonl") == []
+        (tmp_path / "events.json").write_bytes(dumps_bytes([{"n": 0}]))
+        utils_module.reset_caches()
+        
+        assert utils_module.load_jsonl("events.jsonl") == [{"n": 0}]
+    
+    @pytest.mark.skipif(os.name != "posix", reason="POSIX file modes")
+    def test_new_files_follow_umask(self, tmp_path):
+        """Files created by save_json_file should get the umask's mode."""
+        import core.utils as utils_module
+        utils_module.set_data_dir(str(tmp_path))
+        
+        old_umask = utils_module._UMASK
+        utils_module._UMASK = 0o077
+        try:
+            assert utils_module.save_json_file("policies.json", [])
+        finally:
+            utils_module._UMASK = old_umask
+        
+        assert (tmp_path / "policies.json").stat().st_mode & 0o777 == 0o600
+    
+    def test_audit_writer_flush(self, tmp_path):
+        """Queued items should be on disk, in order, after flush()."""
+        import core.utils as utils_module
+        utils_module.set_data_dir(str(tmp_path))
+        
+        writer = utils_module.AuditWriter()
+        for i in range(5):
+            writer.put("queued.jsonl", {"n": i})
+        writer.flush()
+        
+        items = utils_module.load_jsonl("queued.jsonl")
+        assert [item["n"] for item in items] == [0, 1, 2, 3, 4]
+    
+    def test_audit_writer_put_many(self, tmp_path):
+        """put_many() should append each item to its own file."""
+        import core.utils as utils_module
+        utils_module.set_data_dir(str(tmp_path))
+        
+        writer = utils_module.AuditWriter()
+        writer.put_many([("first.jsonl", {"n": 1}), ("second.jsonl", {"n": 2})])
+        writer.flush()
+        
+        assert utils_module.load_jsonl("first.jsonl") == [{"n": 1}]
+        assert utils_module.load_jsonl("second.jsonl") == [{"n": 2}]
+    
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+    def test_background_writers_after_fork(self, tmp_path):
+        """A forked child should start its own writer and agents flusher."""
+        import core.utils as utils_module
+        utils_module.set_data_dir(str(tmp_path))
+        
+        # Start both background threads in the parent
+        utils_module.audit_writer.put("forked.jsonl", {"n": 0})
+        utils_module.audit_writer.flush()
+        utils_module.save_agents_deferred(utils_module.load_agents())
+        
+        pid = os.fork()
+        if pid == 0:
+            # Child: a hang is killed by the alarm and reported as failure
+            signal.alarm(5)
+            try:
+                utils_module.audit_writer.put("forked.jsonl", {"n": 1})
+                items = utils_module.load_jsonl("forked.jsonl")
+                utils_module.save_agents_deferred(utils_module.load_agents())
+                ok = [i["n"] for i in items] == [0, 1] and utils_module._agents_flusher.is_alive()
+            except BaseException:
+                ok = False
+            os._exit(0 if ok else 1)
+        
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+    
+    def test_deferred_agents_save(self, tmp_path):
+        """Deferred agent changes should be visible at once and on disk after flush."""
+        import core.utils as utils_module
+        utils_module.set_data_dir(str(tmp_path))
+        
+        agents = utils_module.load_agents()
+        agents["deferred-agent"] = {"agent_id": "deferred-agent", "trust_level": "low"}
+        utils_module.save_agents_deferred(agents)
+        assert "deferred-agent" in utils_module.load_agents()
+        
+        assert utils_module.flush_agents() is True
+        assert "deferred-agent" in loads_json((tmp_path / "agents.json").read_bytes())
 
 
 if __name__ == "__main__":